@@ -1,8 +1,13 @@
+import logging
 import os
 from dotenv import load_dotenv
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
-from sheets import find_order, search_by_name, list_pending_in_range, list_pending_in_month, summarize_orders, list_pending
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.ext import Application, CommandHandler, ContextTypes, InlineQueryHandler, MessageHandler, filters
+from sheets import find_order, find_orders, prefix_search, search_by_name, list_pending_in_range, list_pending_in_month, summarize_orders, list_pending, pending_aging, status_counts, run_reports, Order, DoneOrder, SNAPSHOT_TTL
+import cassette
+import history
+import reports
+import snapshot_share
 from html import escape
 from telegram.constants import ParseMode
 from datetime import datetime, date, timedelta
@@ -11,6 +16,19 @@ from zoneinfo import ZoneInfo
 import asyncio
 from calendar import monthrange
 import re
+import csv
+import io
+from quota import SheetsBusy, background_priority
+from update_processor import ChatOrderedProcessor
+
+# batas mode bulk /order
+BULK_MAX_KEYS = 500
+BULK_INLINE_MAX = 20             # lebih dari ini → hasil dikirim sebagai file CSV
+BULK_MAX_FILE_BYTES = 1_000_000
+
+# inline query (@bot <teks>)
+INLINE_PAGE_SIZE = 20
+INLINE_CACHE_TIME = 30           # detik; Telegram menyimpan jawaban untuk query yang sama
 
 def _highlight(text: str, query: str) -> str:
     if not text or not query:
@@ -21,19 +39,35 @@ def _highlight(text: str, query: str) -> str:
         return escape(t)
     return escape(t[:i]) + "<b>" + escape(t[i:i+len(q)]) + "</b>" + escape(t[i+len(q):])
 
-def _format_item(i: int, d: dict, query: str) -> str:
-    name = _highlight(d.get("CUSTOMER_NAME",""), query)
-    order_id = escape(d.get("ORDER_ID",""))
-    no_sc = escape(d.get("NO_SC",""))
-    status_do = escape(d.get("STATUS_DO",""))
-    jenis = escape(d.get("JENIS_ORDER",""))
-    tgl = escape(d.get("ORDER_DATE",""))
+def _format_item(i: int, d: Order | DoneOrder, query: str) -> str:
+    name = _highlight(d.customer_name, query)
+    order_id = escape(d.order_id)
+    no_sc = escape(d.no_sc)
+    status_do = escape(d.status_do)
+    jenis = escape(d.jenis_order)
+    tgl = escape(d.order_date)
     return (
         f"<b>{i}. {name}</b>\n"
         f"  <b>ORDER_ID:</b> <code>{order_id}</code> | <b>No SC:</b> <code>{no_sc}</code>\n"
         f"  <b>Status DO:</b> {status_do} | <b>Jenis Order:</b> {jenis} | <b>Tgl:</b> {tgl}"
     )
 
+def _format_order_detail(data: Order | DoneOrder) -> str:
+    return (
+        f"<b>ORDER_ID:</b> <code>{escape(data.order_id)}</code>\n"
+        f"<b>No SC:</b> <code>{escape(data.no_sc)}</code>\n"
+        f"<b>Status DO:</b> {escape(data.status_do)}\n"
+        f"<b>Customer:</b> {escape(data.customer_name)}\n"
+        f"<b>Jenis Order:</b> {escape(data.jenis_order)}\n"
+        f"<b>Order Date:</b> {escape(data.order_date)}"
+    )
+
+def _sheet_error(e: Exception, prefix: str = "Error membaca sheet") -> str:
+    """Pesan error untuk user; kuota penuh dijelaskan dengan bahasa yang lebih ramah."""
+    if isinstance(e, SheetsBusy):
+        return f"Server sedang ramai. {escape(str(e))}"
+    return f"{prefix}: <code>{escape(str(e))}</code>"
+
 def _get_admin_ids() -> list[int]:
     raw = os.getenv("ADMIN_CHAT_IDS", "")  # nama variabel ENV pakai huruf besar
     ids: list[int] = []
@@ -57,7 +91,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "<b>Panduan Perintah:</b>\n"
         "• /order <ORDER_ID atau No SC>\n"
         "   ➝ Cek detail status order.\n"
-        "   Contoh: <code>/order 1000353626</code>\n\n"
+        "   Contoh: <code>/order 1000353626</code>\n"
+        "   Bisa banyak sekaligus: <code>/order 1000353626 1000353627 SC1000353628</code>\n"
+        "   atau kirim file .txt/.csv berisi daftar ORDER_ID / No SC\n"
+        "   (di grup: beri caption <code>/order</code> pada file).\n\n"
         "• /search <nama customer>\n"
         "   ➝ Cari order berdasarkan nama customer.\n"
         "   Contoh: <code>/search budi</code>\n\n"
@@ -71,7 +108,17 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• /summarybranch [DATEL] [YYYY-MM]\n"
         "   ➝ Ringkasan per status & jenis order.\n"
         "   Contoh: <code>/summarybranch JAMBI 2025-08</code>\n\n"
-        "Semua data diambil langsung dari Google Sheets (Order MODOROSO)."
+        "• /aging [DATEL]\n"
+        "   ➝ Umur order pending per bucket (0-3, 4-7, 8-14, 15-30, >30 hari).\n"
+        "   Contoh: <code>/aging JAMBI</code>\n\n"
+        "• /trend [DATEL] [HARI]\n"
+        "   ➝ Tren jumlah order pending harian (default 30 hari).\n"
+        "   Contoh: <code>/trend JAMBI 90</code>\n\n"
+        "• Ketik <code>@namabot 100035</code> atau <code>@namabot budi</code> di chat mana pun\n"
+        "   ➝ Cari cepat ORDER_ID / No SC / nama customer.\n\n"
+        f"Data diambil dari snapshot Google Sheets (Order MODOROSO) yang diperbarui tiap {SNAPSHOT_TTL:g} detik, "
+        "jadi perubahan di sheet bisa belum terlihat selama itu"
+        + (" (sedikit lebih lama, karena bot berjalan di beberapa proses)." if snapshot_share.SNAPSHOT_ROLE == "worker" else ".")
     )
     await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
@@ -82,12 +129,17 @@ async def order_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                         parse_mode=ParseMode.HTML)
         return
 
-    order_key = context.args[0]
+    keys = _extract_order_keys(" ".join(context.args))
+    if len(keys) > 1:
+        await _reply_bulk_orders(update, keys)
+        return
+
+    # satu key → pakai hasil ekstraksi (tanpa tanda baca / token non-ID); tidak ada → argumen apa adanya
+    order_key = keys[0] if keys else context.args[0]
     try:
-        data = find_order(order_key)
+        data = await asyncio.to_thread(find_order, order_key)
     except Exception as e:
-        await update.message.reply_text(f"Error membaca sheet: {escape(str(e))}",
-                                        parse_mode=ParseMode.HTML)
+        await update.message.reply_text(_sheet_error(e), parse_mode=ParseMode.HTML)
         return
 
     if not data:
@@ -95,15 +147,133 @@ async def order_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                         parse_mode=ParseMode.HTML)
         return
 
-    msg = (
-        f"<b>ORDER_ID:</b> <code>{escape(data['ORDER_ID'])}</code>\n"
-        f"<b>No SC:</b> <code>{escape(data['NO_SC'])}</code>\n"
-        f"<b>Status DO:</b> {escape(data['STATUS_DO'])}\n"
-        f"<b>Customer:</b> {escape(data['CUSTOMER_NAME'])}\n"
-        f"<b>Jenis Order:</b> {escape(data['JENIS_ORDER'])}\n"
-        f"<b>Order Date:</b> {escape(data['ORDER_DATE'])}"
+    await update.message.reply_text(_format_order_detail(data), parse_mode=ParseMode.HTML)
+
+
+def _extract_order_keys(text: str) -> list[str]:
+    """
+    Ambil daftar ORDER_ID / No SC dari teks bebas (pisah spasi, koma, titik koma, baris baru).
+    Token tanpa angka (mis. header CSV) diabaikan; duplikat dibuang, urutan dipertahankan.
+    """
+    seen, keys = set(), []
+    for tok in re.split(r"[\s,;|]+", text or ""):
+        tok = tok.strip().strip("\"'")
+        if not tok or not any(c.isdigit() for c in tok) or tok in seen:
+            continue
+        seen.add(tok)
+        keys.append(tok)
+    return keys
+
+
+async def _reply_bulk_orders(update: Update, keys: list[str]):
+    """Cek banyak order sekaligus: satu kali lookup, balasan ringkas atau file CSV."""
+    note = ""
+    if len(keys) > BULK_MAX_KEYS:
+        note = f"\n<i>Hanya {BULK_MAX_KEYS} key pertama yang dicek (dari {len(keys)}).</i>"
+        keys = keys[:BULK_MAX_KEYS]
+
+    try:
+        found = await asyncio.to_thread(find_orders, keys)
+    except Exception as e:
+        await update.message.reply_text(_sheet_error(e), parse_mode=ParseMode.HTML)
+        return
+
+    hits = [(k, r) for k, r in found.items() if r is not None]
+    misses = [k for k, r in found.items() if r is None]
+    summary = (f"<b>Cek Order (bulk)</b>\n"
+               f"Ditemukan: <b>{len(hits)}</b> dari {len(found)} | "
+               f"Tidak ditemukan: <b>{len(misses)}</b>{note}")
+
+    if len(found) > BULK_INLINE_MAX:
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(["KEY", "HASIL", "ORDER_ID", "NO_SC", "STATUS_DO", "CUSTOMER_NAME", "JENIS_ORDER", "ORDER_DATE"])
+        for k, r in hits:
+            w.writerow([k, "DITEMUKAN", r.order_id, r.no_sc, r.status_do, r.customer_name, r.jenis_order, r.order_date])
+        for k in misses:
+            w.writerow([k, "TIDAK DITEMUKAN", "", "", "", "", "", ""])
+        await update.message.reply_document(
+            document=buf.getvalue().encode("utf-8-sig"),   # BOM agar rapi dibuka di Excel
+            filename="cek_order.csv",
+            caption=summary,
+            parse_mode=ParseMode.HTML,
+        )
+        return
+
+    lines = [summary, ""]
+    for k, r in hits:
+        lines.append(f"<code>{escape(k)}</code> | {escape(r.status_do)} | {escape(r.jenis_order)} | "
+                     f"{escape(r.order_date)} | {escape(r.customer_name)}")
+    if misses:
+        lines.append("\n<b>Tidak ditemukan:</b>")
+        lines.append(", ".join(f"<code>{escape(k)}</code>" for k in misses))
+
+    chunks, buf = [], ""
+    for ln in lines:
+        if len(buf) + len(ln) + 1 > 3500:
+            chunks.append(buf); buf = ln
+        else:
+            buf = (buf + "\n" + ln) if buf else ln
+    if buf: chunks.append(buf)
+
+    for c in chunks:
+        await update.message.reply_text(c, parse_mode=ParseMode.HTML)
+
+
+async def order_file_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """File .txt/.csv berisi ORDER_ID / No SC → cek bulk."""
+    doc = update.message.document
+    if doc.file_size and doc.file_size > BULK_MAX_FILE_BYTES:
+        await update.message.reply_text("File terlalu besar (maks 1 MB).", parse_mode=ParseMode.HTML)
+        return
+
+    f = await doc.get_file()
+    raw = await f.download_as_bytearray()
+    keys = _extract_order_keys(bytes(raw).decode("utf-8-sig", errors="replace"))
+    if not keys:
+        await update.message.reply_text("Tidak ada ORDER_ID / No SC di file tersebut.",
+                                        parse_mode=ParseMode.HTML)
+        return
+    await _reply_bulk_orders(update, keys)
+
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    @bot <ORDER_ID / No SC / nama customer> dari chat mana pun.
+    Dijawab dari index prefix di memori; halaman berikutnya lewat next_offset.
+    """
+    iq = update.inline_query
+    text = iq.query.strip()
+    if len(text) < 2:
+        await iq.answer([], cache_time=INLINE_CACHE_TIME)
+        return
+
+    try:
+        offset = max(0, int(iq.offset or 0))
+    except ValueError:
+        offset = 0
+
+    try:
+        rows, more = await asyncio.to_thread(prefix_search, text, INLINE_PAGE_SIZE, offset)
+    except Exception as e:
+        logging.warning("inline query gagal: %s", e)
+        await iq.answer([], cache_time=5)
+        return
+
+    results = [
+        InlineQueryResultArticle(
+            id=f"{offset + i}:{r.order_id or r.no_sc}"[:64],
+            title=f"{r.order_id or r.no_sc} – {r.customer_name}",
+            description=f"{r.status_do} | {r.jenis_order} | {r.order_date}",
+            input_message_content=InputTextMessageContent(_format_order_detail(r), parse_mode=ParseMode.HTML),
+        )
+        for i, r in enumerate(rows)
+    ]
+    await iq.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME,
+        next_offset=str(offset + INLINE_PAGE_SIZE) if more else "",
     )
-    await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
 
 async def search_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -114,10 +284,9 @@ async def search_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     query = " ".join(context.args).strip()
     try:
-        results = search_by_name(query, limit=50)
+        results = await asyncio.to_thread(search_by_name, query, limit=50)
     except Exception as e:
-        await update.message.reply_text(f"Error membaca sheet: {escape(str(e))}",
-                                        parse_mode=ParseMode.HTML)
+        await update.message.reply_text(_sheet_error(e), parse_mode=ParseMode.HTML)
         return
 
     if not results:
@@ -128,7 +297,7 @@ async def search_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # dedup dan batasi
     seen, dedup = set(), []
     for r in results:
-        key = (r.get("ORDER_ID",""), r.get("NO_SC",""))
+        key = (r.order_id, r.no_sc)
         if key in seen: continue
         seen.add(key); dedup.append(r)
 
@@ -221,7 +390,8 @@ async def pending_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     branch = " ".join(branch_tokens).strip() if branch_tokens else None
 
     try:
-        results = list_pending(
+        results = await asyncio.to_thread(
+            list_pending,
             keyword=keyword,
             start=start,
             end=end,
@@ -231,10 +401,7 @@ async def pending_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             limit=2000
         )
     except Exception as e:
-        await update.message.reply_text(
-            f"Error membaca sheet: <code>{escape(str(e))}</code>",
-            parse_mode=ParseMode.HTML
-        )
+        await update.message.reply_text(_sheet_error(e), parse_mode=ParseMode.HTML)
         return
 
     if not results:
@@ -250,7 +417,7 @@ async def pending_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Dedup hasil (ORDER_ID, NO_SC)
     seen, dedup = set(), []
     for r in results:
-        key = (r.get("ORDER_ID",""), r.get("NO_SC",""))
+        key = (r.order_id, r.no_sc)
         if key in seen:
             continue
         seen.add(key)
@@ -305,7 +472,11 @@ async def pending_date_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if end and end < start:
         start, end = end, start
 
-    results = list_pending_in_range(start, end, limit=2000)  # ambil banyak
+    try:
+        results = await asyncio.to_thread(list_pending_in_range, start, end, limit=2000)  # ambil banyak
+    except Exception as e:
+        await update.message.reply_text(_sheet_error(e), parse_mode=ParseMode.HTML)
+        return
     if not results:
         await update.message.reply_text(
             f"Tidak ada order pending pada rentang "
@@ -317,7 +488,7 @@ async def pending_date_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # dedup
     seen, dedup = set(), []
     for r in results:
-        key = (r.get("ORDER_ID",""), r.get("NO_SC",""))
+        key = (r.order_id, r.no_sc)
         if key in seen: continue
         seen.add(key); dedup.append(r)
 
@@ -364,7 +535,11 @@ async def pending_month_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                         parse_mode=ParseMode.HTML)
         return
 
-    results = list_pending_in_month(y, m, limit=2000)
+    try:
+        results = await asyncio.to_thread(list_pending_in_month, y, m, limit=2000)
+    except Exception as e:
+        await update.message.reply_text(_sheet_error(e), parse_mode=ParseMode.HTML)
+        return
     from calendar import month_name
     label = f"{month_name[m]} {y}"
 
@@ -378,7 +553,7 @@ async def pending_month_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # dedup
     seen, dedup = set(), []
     for r in results:
-        key = (r.get("ORDER_ID",""), r.get("NO_SC",""))
+        key = (r.order_id, r.no_sc)
         if key in seen: continue
         seen.add(key); dedup.append(r)
 
@@ -396,73 +571,120 @@ async def pending_month_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(c, parse_mode=ParseMode.HTML)
 
 
-async def send_pending_last7days(context: ContextTypes.DEFAULT_TYPE):
-    admin_chat_ids = _get_admin_ids()
-    if not admin_chat_ids:
-        return
-
-    end = date.today()
-    start = end - timedelta(days=6)
-
-    # Ambil data
-    try:
-        results = await asyncio.to_thread(list_pending_in_range, start, end, 5000)
-    except Exception as e:
-        for chat_id in admin_chat_ids:
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=(f"<b>Ringkasan Pending – 7 Hari Terakhir</b>\n"
-                      f"Rentang: <code>{start}</code> – <code>{end}</code>\n"
-                      f"Gagal membaca data: <code>{escape(str(e))}</code>"),
-                parse_mode=ParseMode.HTML
-            )
-        return
-
-    # Header ringkas
-    header_msg = (
-        f"<b>Ringkasan Pending – 7 Hari Terakhir</b>\n"
-        f"Rentang: <code>{start}</code> – <code>{end}</code>\n"
-        f"Total: <b>{len(results)}</b>"
-    )
+def _chunk_lines(lines: list[str], sep: str = "\n", limit: int = 3500) -> list[str]:
+    """Gabung baris jadi pesan-pesan ≤ limit karakter."""
+    buf, chunks = "", []
+    for ln in lines:
+        if buf and len(buf) + len(ln) + len(sep) > limit:
+            chunks.append(buf); buf = ln
+        else:
+            buf = (buf + sep + ln) if buf else ln
+    if buf:
+        chunks.append(buf)
+    return chunks
 
-    for chat_id in admin_chat_ids:
-        try:
-            await context.bot.send_message(chat_id=chat_id, text=header_msg, parse_mode=ParseMode.HTML)
-        except Exception as e:
-            print(f"[WARN] gagal kirim header ke {chat_id}: {e}")
-        await asyncio.sleep(0.25)
 
-    if not results:
-        return
+def _render_pending_report(spec: reports.ReportSpec, results: list[Order], today: date) -> list[str]:
+    start, end = reports.period(spec, today)
+    title = f"<b>Ringkasan Pending – {spec.days} Hari Terakhir</b>" if spec.days else "<b>Ringkasan Pending</b>"
+    header = [title]
+    if spec.branch:
+        header.append(f"Branch: <b>{escape(spec.branch)}</b>")
+    if start:
+        header.append(f"Rentang: <code>{start}</code> – <code>{end}</code>")
+    header.append(f"Total: <b>{len(results)}</b>")
 
     # Dedup hasil (ORDER_ID, NO_SC)
     seen, dedup = set(), []
     for r in results:
-        key = (r.get("ORDER_ID",""), r.get("NO_SC",""))
-        if key in seen: 
+        key = (r.order_id, r.no_sc)
+        if key in seen:
             continue
         seen.add(key)
         dedup.append(r)
 
-    # Kirim detail seperti sebelumnya
-    buf, chunks = "", []
-    for i, d in enumerate(dedup, 1):
-        line = _format_item(i, d, "")
-        if len(buf) + len(line) + 2 > 3500:
-            chunks.append(buf); buf = line
-        else:
-            buf = (buf + ("\n\n" if buf else "")) + line
-    if buf:
-        chunks.append(buf)
+    items = [_format_item(i, d, "") for i, d in enumerate(dedup, 1)]
+    return ["\n".join(header)] + _chunk_lines(items, sep="\n\n")
 
-    for c in chunks:
-        for chat_id in admin_chat_ids:
-            try:
-                await context.bot.send_message(chat_id=chat_id, text=c, parse_mode=ParseMode.HTML)
-            except Exception as e:
-                print(f"[WARN] gagal kirim detail ke {chat_id}: {e}")
-            await asyncio.sleep(0.35)
 
+def _render_report(spec: reports.ReportSpec, res, today: date) -> list[str]:
+    """Render satu hasil laporan jadi pesan-pesan HTML (dipakai ulang untuk semua penerima)."""
+    if spec.kind == "pending":
+        return _render_pending_report(spec, res, today)
+    target = escape(spec.branch or "SEMUA BRANCH")
+    if spec.kind == "summary":
+        start, end = reports.period(spec, today)
+        if not res["grand_total"]:
+            return [f"Tidak ada data untuk <b>{target}</b> pada {start:%Y-%m}."]
+        return _chunk_lines(_format_summary(res, spec.branch, start, end))
+    if not res["grand_total"]:
+        return [f"Tidak ada order pending untuk <b>{target}</b>."]
+    return _chunk_lines(_format_aging(res, spec.branch))
+
+
+async def _send_reports(context: ContextTypes.DEFAULT_TYPE, due: list[tuple[reports.ReportSpec, list[int]]],
+                        today: date):
+    """Hitung semua laporan yang jatuh tempo dalam satu kali scan, render sekali, kirim ke tiap chat."""
+    try:
+        # job terjadwal antre di belakang perintah user kalau kuota menipis
+        with background_priority():
+            results = await asyncio.to_thread(run_reports, [reports.request_for(spec, today) for spec, _ in due])
+    except Exception as e:
+        for spec, chat_ids in due:
+            for chat_id in chat_ids:
+                try:
+                    await context.bot.send_message(
+                        chat_id=chat_id,
+                        text=f"<b>Laporan {escape(spec.name)}</b>\nGagal membaca data: <code>{escape(str(e))}</code>",
+                        parse_mode=ParseMode.HTML
+                    )
+                except Exception as e2:
+                    print(f"[WARN] gagal kirim error laporan ke {chat_id}: {e2}")
+        return
+
+    for (spec, chat_ids), res in zip(due, results):
+        for msg in _render_report(spec, res, today):
+            for chat_id in chat_ids:
+                try:
+                    await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode=ParseMode.HTML)
+                except Exception as e:
+                    print(f"[WARN] gagal kirim laporan {spec.name} ke {chat_id}: {e}")
+                await asyncio.sleep(0.35)
+
+
+JAKARTA = ZoneInfo("Asia/Jakarta")
+REPORT_MAX_CATCHUP = 5   # menit; tick yang terlambat lebih dari ini tidak disusul
+
+async def report_tick(context: ContextTypes.DEFAULT_TYPE):
+    """Job tiap menit: kirim semua laporan REPORTS_FILE yang jadwal cron-nya cocok."""
+    specs = context.bot_data["reports"]
+    now = datetime.now(JAKARTA).replace(second=0, microsecond=0)
+    last = context.bot_data.get("reports_last_tick")
+    if last is not None and now <= last:
+        return   # menit ini sudah diproses (dua tick jatuh di menit yang sama)
+    if last is None or now - last > timedelta(minutes=REPORT_MAX_CATCHUP):
+        last = now - timedelta(minutes=1)
+    context.bot_data["reports_last_tick"] = now
+
+    # menit yang terlewat (job terlambat) ikut diproses; laporan identik cukup sekali
+    admins = _get_admin_ids()
+    due: dict[tuple, tuple[reports.ReportSpec, list[int]]] = {}
+    t = last + timedelta(minutes=1)
+    while t <= now:
+        for spec, chat_ids in reports.due_reports(specs, t, admins):
+            _, chats = due.setdefault(spec.key(), (spec, []))
+            chats.extend(c for c in chat_ids if c not in chats)
+        t += timedelta(minutes=1)
+    if due:
+        await _send_reports(context, list(due.values()), now.date())
+
+
+async def send_pending_last7days(context: ContextTypes.DEFAULT_TYPE):
+    admin_chat_ids = _get_admin_ids()
+    if not admin_chat_ids:
+        return
+    today = datetime.now(JAKARTA).date()
+    await _send_reports(context, [(reports.DEFAULT_REPORTS[0], admin_chat_ids)], today)
 
 
 async def summary_branch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -502,18 +724,12 @@ async def summary_branch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE)
     end = date(y, m, monthrange(y, m)[1])
 
     try:
-        res = summarize_orders(branch=branch, start=start, end=end)
+        res = await asyncio.to_thread(summarize_orders, branch=branch, start=start, end=end)
     except Exception as e:
-        await update.message.reply_text(
-            f"Gagal membaca data: <code>{escape(str(e))}</code>", parse_mode=ParseMode.HTML
-        )
+        await update.message.reply_text(_sheet_error(e, "Gagal membaca data"), parse_mode=ParseMode.HTML)
         return
 
-    per_status = res["per_status"]
-    grand = res["grand_total"]
-    by_jenis = res["totals_by_jenis"]
-
-    if not grand:
+    if not res["grand_total"]:
         target = branch or "SEMUA BRANCH"
         await update.message.reply_text(
             f"Tidak ada data untuk <b>{escape(target)}</b> pada {y}-{m:02d}.",
@@ -521,22 +737,8 @@ async def summary_branch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return
 
-    title = f"<b>SUMMARY MTD {y}-{m:02d}</b>\n"
-    if branch:
-        title += f"Branch: <b>{escape(branch)}</b>\n"
-    else:
-        title += "Branch: <b>SEMUA</b>\n"
-    title += f"Periode: <code>{start}</code> – <code>{end}</code>\n\n"
-
-    # daftar status (semua, termasuk Complete & Cancel)
-    lines = [title]
-    for k, v in per_status.items():
-        lines.append(f"{escape(k)}: <b>{v}</b>")
-
-    # total per jenis
-    jenis_line = " | ".join([f"{j}: {by_jenis.get(j,0)}" for j in ["MO","DO","RO","SO","PDA","CO","CN","AS","MIGRATE"]])
-    lines.append(f"\n<b>Total per Jenis</b>\n{escape(jenis_line)}")
-    lines.append(f"\nTOTAL: <b>{grand}</b>")
+    lines = _format_summary(res, branch, start, end)
+    title = lines[0]
 
     # pecah jika kepanjangan
     text = "\n".join(lines)
@@ -557,14 +759,167 @@ async def summary_branch_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE)
     else:
         await update.message.reply_text(text, parse_mode=ParseMode.HTML)
 
-import logging
+
+def _format_summary(res: dict, branch: str | None, start: date, end: date) -> list[str]:
+    """Render hasil summarize_orders jadi baris-baris pesan HTML (baris pertama = judul)."""
+    per_status = res["per_status"]
+    grand = res["grand_total"]
+    by_jenis = res["totals_by_jenis"]
+
+    title = f"<b>SUMMARY MTD {start:%Y-%m}</b>\n"
+    if branch:
+        title += f"Branch: <b>{escape(branch)}</b>\n"
+    else:
+        title += "Branch: <b>SEMUA</b>\n"
+    title += f"Periode: <code>{start}</code> – <code>{end}</code>\n\n"
+
+    # daftar status (semua, termasuk Complete & Cancel)
+    lines = [title]
+    for k, v in per_status.items():
+        lines.append(f"{escape(k)}: <b>{v}</b>")
+
+    # total per jenis
+    jenis_line = " | ".join([f"{j}: {by_jenis.get(j,0)}" for j in ["MO","DO","RO","SO","PDA","CO","CN","AS","MIGRATE"]])
+    lines.append(f"\n<b>Total per Jenis</b>\n{escape(jenis_line)}")
+    lines.append(f"\nTOTAL: <b>{grand}</b>")
+
+    return lines
+
+
+def _format_aging(res: dict, branch: str | None) -> list[str]:
+    """Render hasil pending_aging jadi baris-baris pesan HTML."""
+    labels = res["buckets"]
+    lines = [
+        "<b>Aging Order Pending</b>",
+        f"Branch: <b>{escape(branch) if branch else 'SEMUA'}</b>",
+        f"Per tanggal: <code>{res['today']}</code> | Total: <b>{res['grand_total']}</b>",
+        "",
+    ]
+    for label in labels:
+        n = res["totals"].get(label, 0)
+        line = f"<b>{escape(label)}</b>: {n}"
+        o = res["oldest"].get(label)
+        if o is not None:
+            line += f"\n  tertua: <code>{escape(o.order_id)}</code> {escape(o.order_date)} – {escape(o.customer_name)}"
+        lines.append(line)
+
+    header = " | ".join(escape(l) for l in labels)
+    def table(title: str, rows: dict[str, dict[str, int]]):
+        lines.append(f"\n<b>{title}</b> ({header})")
+        for name, counts in rows.items():
+            lines.append(f"{escape(name)}: " + " | ".join(str(counts.get(l, 0)) for l in labels))
+
+    table("Per Jenis", res["by_jenis"])
+    if not branch:
+        table("Per Branch", res["by_branch"])
+    return lines
+
+
+async def aging_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /aging [NAMA_BRANCH]
+    Histogram umur order pending (0-3, 4-7, 8-14, 15-30, >30 hari) + order tertua per bucket.
+    """
+    branch = " ".join(context.args or []).strip() or None
+    try:
+        res = await asyncio.to_thread(pending_aging, branch)
+    except Exception as e:
+        await update.message.reply_text(_sheet_error(e, "Gagal membaca data"), parse_mode=ParseMode.HTML)
+        return
+
+    if not res["grand_total"]:
+        target = branch or "SEMUA BRANCH"
+        await update.message.reply_text(f"Tidak ada order pending untuk <b>{escape(target)}</b>.",
+                                        parse_mode=ParseMode.HTML)
+        return
+
+    chunk = ""
+    for ln in _format_aging(res, branch):
+        if len(chunk) + len(ln) + 1 > 3500:
+            await update.message.reply_text(chunk, parse_mode=ParseMode.HTML)
+            chunk = ln
+        else:
+            chunk = (chunk + "\n" + ln) if chunk else ln
+    if chunk:
+        await update.message.reply_text(chunk, parse_mode=ParseMode.HTML)
+
+async def record_daily_history(context: ContextTypes.DEFAULT_TYPE):
+    """Job harian: simpan hitungan per branch/status/jenis ke history lokal."""
+    today = datetime.now(ZoneInfo("Asia/Jakarta")).date()
+    try:
+        with background_priority():
+            rows = await asyncio.to_thread(status_counts)
+        n = await asyncio.to_thread(history.record_day, today, rows)
+        logging.info("history %s: %d baris disimpan", today, n)
+    except Exception:
+        logging.exception("Gagal menyimpan history harian")
+
+
+async def trend_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /trend [NAMA_BRANCH] [JUMLAH_HARI]
+    Contoh:
+      /trend            -> semua branch, 30 hari terakhir
+      /trend JAMBI 90   -> JAMBI, 90 hari terakhir
+    """
+    args = list(context.args or [])
+    days = 30
+    if args and args[-1].isdigit():
+        days = max(1, min(int(args.pop()), 366))
+    branch = " ".join(args).strip() or None
+
+    end = datetime.now(ZoneInfo("Asia/Jakarta")).date()
+    start = end - timedelta(days=days - 1)
+    try:
+        points = await asyncio.to_thread(history.pending_trend, start, end, branch)
+    except Exception as e:
+        await update.message.reply_text(f"Gagal membaca history: <code>{escape(str(e))}</code>",
+                                         parse_mode=ParseMode.HTML)
+        return
+
+    target = escape(branch) if branch else "SEMUA"
+    if not points:
+        await update.message.reply_text(
+            f"Belum ada history pending untuk <b>{target}</b> pada {start} – {end}.",
+            parse_mode=ParseMode.HTML
+        )
+        return
+
+    top = max(n for _, n in points) or 1
+    first, last = points[0][1], points[-1][1]
+    lines = [
+        f"<b>Tren Pending – {days} Hari</b>",
+        f"Branch: <b>{target}</b>",
+        f"Awal: <b>{first}</b> → Akhir: <b>{last}</b> ({last - first:+d})",
+        "",
+    ]
+    for d, n in points:
+        bar = "▇" * max(1, round(n / top * 20)) if n else ""
+        lines.append(f"<code>{d:%m-%d} {n:>6}</code> {bar}")
+
+    chunk = ""
+    for ln in lines:
+        if len(chunk) + len(ln) + 1 > 3500:
+            await update.message.reply_text(chunk, parse_mode=ParseMode.HTML)
+            chunk = ln
+        else:
+            chunk = (chunk + "\n" + ln) if chunk else ln
+    if chunk:
+        await update.message.reply_text(chunk, parse_mode=ParseMode.HTML)
+
 logging.basicConfig(level=logging.INFO)
 async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE):
     logging.exception("Unhandled exception", exc_info=context.error)
 
 
-def main():
-    app = Application.builder().token(BOT_TOKEN).build()
+def build_app(builder=None) -> Application:
+    """
+    Application dengan semua handler (tanpa job terjadwal).
+    `builder` bisa diganti, mis. replay.py memakai Bot API tiruan (cassette.CaptureRequest).
+    """
+    builder = builder or Application.builder().token(BOT_TOKEN)
+    # update diproses paralel; per chat tetap berurutan, per user dibatasi (lihat update_processor.py)
+    app = builder.concurrent_updates(ChatOrderedProcessor()).build()
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("order", order_cmd))
     app.add_handler(CommandHandler("search", search_cmd))
@@ -572,18 +927,46 @@ def main():
     app.add_handler(CommandHandler("pendingdate", pending_date_cmd))
     app.add_handler(CommandHandler("pendingmonth", pending_month_cmd))
     app.add_handler(CommandHandler("summarybranch", summary_branch_cmd))
+    app.add_handler(CommandHandler("aging", aging_cmd))
+    app.add_handler(CommandHandler("trend", trend_cmd))
+    app.add_handler(MessageHandler(
+        (filters.Document.FileExtension("txt") | filters.Document.FileExtension("csv"))
+        # di grup hanya file yang diberi caption /order, supaya file lain di grup tidak ikut diproses
+        & (filters.ChatType.PRIVATE | filters.CaptionRegex(r"^/order(@\w+)?(\s|$)")),
+        order_file_cmd,
+    ))
+    # inline mode harus diaktifkan lewat @BotFather (/setinline)
+    app.add_handler(InlineQueryHandler(inline_query))
     app.add_error_handler(on_error)
-
-    jakarta = ZoneInfo("Asia/Jakarta")
+    return app
+
+
+def schedule_jobs(app: Application):
+    # laporan terjadwal dari REPORTS_FILE (tanpa file: pending 7 hari pukul 10:15 ke admin)
+    app.bot_data["reports"] = reports.load_reports()
+    now = datetime.now(JAKARTA)
+    app.job_queue.run_repeating(
+        report_tick,
+        interval=60,
+        first=60 - now.second - now.microsecond / 1e6,   # sejajar awal menit
+        name="scheduled_reports",
+    )
     app.job_queue.run_daily(
-        send_pending_last7days,
-        time=dtime(hour=10, minute=15, tzinfo=jakarta),
-        name="daily_pending_last7days",
+        record_daily_history,
+        time=dtime(hour=23, minute=50, tzinfo=JAKARTA),
+        name="daily_history_snapshot",
     )
 
     # tes sekali 5 detik setelah start (hapus kalau sudah tidak perlu)
     app.job_queue.run_once(send_pending_last7days, when=20)
 
+
+def main():
+    app = build_app()
+    schedule_jobs(app)
+    # rekam trafik asli untuk diputar ulang offline (lihat cassette.py / replay.py)
+    if os.getenv("RECORD_CASSETTE"):
+        cassette.start_recording(app, os.getenv("RECORD_CASSETTE"))
     app.run_polling()
 
 
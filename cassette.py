@@ -0,0 +1,227 @@
+"""
+Rekam & putar ulang trafik bot (Google Sheets + update Telegram) ke file cassette.
+
+Rekam dari bot asli:
+    RECORD_CASSETTE=cassettes/hari-ini.jsonl python bot.py
+Putar ulang offline (tanpa jaringan), lihat replay.py:
+    python replay.py cassettes/hari-ini.jsonl
+
+Format cassette: JSON Lines, satu event per baris
+  {"kind": "update", "t": detik sejak mulai rekam, "data": Update.to_dict()}
+  {"kind": "sheet",  "t": ..., "key": [sheet_id, tab], "method": "get_all_values" | "get_values" | "row_count",
+   "arg": range atau null, "elapsed": durasi panggilan (detik), "data": nilai}
+Respons sheet hanya direkam sekali per (key, method, arg) → replay selalu memakai data yang sama.
+Cassette berisi data order & chat asli: simpan di luar repo (/cassettes/ sudah di .gitignore).
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+from telegram.request import BaseRequest
+
+import sheets
+
+
+# -----------------------------
+# REKAM
+# -----------------------------
+class Recorder:
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._seen: set[tuple] = set()
+
+    def _write(self, event: dict):
+        event["t"] = round(time.monotonic() - self._t0, 3)
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def update(self, update: Update):
+        self._write({"kind": "update", "data": update.to_dict()})
+
+    def sheet(self, key: tuple[str, str], method: str, arg, value, elapsed: float):
+        ident = (key, method, arg)
+        with self._lock:
+            if ident in self._seen:
+                return
+            self._seen.add(ident)
+        self._write({"kind": "sheet", "key": list(key), "method": method, "arg": arg,
+                     "elapsed": round(elapsed, 4), "data": value})
+
+
+class RecordingWorksheet:
+    """Bungkus gspread.Worksheet: tiap respons baca ikut ditulis ke cassette."""
+
+    def __init__(self, ws, key: tuple[str, str], recorder: Recorder):
+        self._ws = ws
+        self._key = key
+        self._rec = recorder
+
+    def _call(self, method: str, arg, fn, *args):
+        started = time.monotonic()
+        value = fn(*args)
+        self._rec.sheet(self._key, method, arg, value, time.monotonic() - started)
+        return value
+
+    def get_all_values(self):
+        return self._call("get_all_values", None, self._ws.get_all_values)
+
+    def get_values(self, range_name: str):
+        return self._call("get_values", range_name, self._ws.get_values, range_name)
+
+    @property
+    def row_count(self) -> int:
+        n = self._ws.row_count
+        self._rec.sheet(self._key, "row_count", None, n, 0.0)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+
+def start_recording(app: Application, path: str) -> Recorder:
+    """Rekam semua update yang masuk ke `app` dan semua respons Sheets ke `path`."""
+    rec = Recorder(path)
+    get_ws = sheets.get_ws
+
+    def recording_get_ws(worksheet_name: str | None = None, sheet_id: str | None = None):
+        key = (sheet_id or sheets.SHEET_ID, worksheet_name or sheets.DEFAULT_WORKSHEET)
+        return RecordingWorksheet(get_ws(worksheet_name, sheet_id), key, rec)
+
+    async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        rec.update(update)
+
+    sheets.get_ws = recording_get_ws
+    # group -1: jalan sebelum handler lain dan tidak menghentikan propagasi
+    app.add_handler(TypeHandler(Update, record_update), group=-1)
+    return rec
+
+
+# -----------------------------
+# PUTAR ULANG
+# -----------------------------
+def load(path: str) -> tuple[list[dict], dict[tuple, dict]]:
+    """Baca cassette → (event update urut waktu, {(sheet_id, tab, method, arg): event sheet})."""
+    updates: list[dict] = []
+    responses: dict[tuple, dict] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            ev = json.loads(line)
+            if ev["kind"] == "update":
+                updates.append(ev)
+            elif ev["kind"] == "sheet":
+                responses.setdefault((*ev["key"], ev["method"], ev["arg"]), ev)
+    updates.sort(key=lambda ev: ev["t"])
+    return updates, responses
+
+
+class CassetteWorksheet:
+    """
+    Pengganti gspread.Worksheet yang menjawab dari cassette.
+    delay=True: tiap panggilan ditahan selama durasi aslinya, supaya latensi jaringan ikut terulang.
+    get_values(range) yang tidak terekam dipotong dari get_all_values (dan sebaliknya tidak bisa).
+    """
+
+    def __init__(self, key: tuple[str, str], responses: dict[tuple, dict], delay: bool = True):
+        self.key = key
+        self.title = key[1]
+        self._responses = responses
+        self._delay = delay
+
+    def _get(self, method: str, arg=None) -> dict | None:
+        return self._responses.get((*self.key, method, arg))
+
+    def _answer(self, ev: dict):
+        if self._delay and ev["elapsed"]:
+            time.sleep(ev["elapsed"])
+        return ev["data"]
+
+    def get_all_values(self):
+        ev = self._get("get_all_values")
+        if ev is None:
+            raise RuntimeError(f"Tab {self.key[1]!r} ({self.key[0]}) tidak ada di cassette.")
+        return self._answer(ev)
+
+    def get_values(self, range_name: str):
+        ev = self._get("get_values", range_name)
+        if ev is not None:
+            return self._answer(ev)
+        a, b = (int(x) for x in range_name.split(":"))
+        page = self.get_all_values()[a - 1:b]
+        while page and not any(page[-1]):   # seperti API: baris kosong di ujung dibuang
+            page.pop()
+        return page or [[]]
+
+    @property
+    def row_count(self) -> int:
+        ev = self._get("row_count")
+        if ev is not None:
+            return ev["data"]
+        full = self._get("get_all_values")
+        return len(full["data"]) if full else 1
+
+
+def install_sheets(responses: dict[tuple, dict], delay: bool = True):
+    """Arahkan semua akses Sheets di modul sheets ke cassette; cache snapshot dikosongkan."""
+    def cassette_get_ws(worksheet_name: str | None = None, sheet_id: str | None = None):
+        key = (sheet_id or sheets.SHEET_ID, worksheet_name or sheets.DEFAULT_WORKSHEET)
+        return CassetteWorksheet(key, responses, delay)
+
+    sheets.get_ws = cassette_get_ws
+    sheets._ws_cache.clear()
+    sheets._snapshots.clear()
+
+
+class CaptureRequest(BaseRequest):
+    """
+    Pengganti koneksi ke Bot API: semua request (sendMessage, answerInlineQuery, ...) dicatat
+    di `calls` dan langsung dijawab sukses tanpa jaringan, dengan jeda `latency` detik.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: list[tuple[float, str, dict]] = []   # (waktu monotonic, endpoint, parameter)
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs) -> tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls.append((time.monotonic(), endpoint, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method == "GET":   # unduhan file (mis. lampiran /order) tidak direkam
+            return 200, b""
+        return 200, json.dumps({"ok": True, "result": self._result(endpoint, params)}).encode()
+
+    def _result(self, endpoint: str, params: dict):
+        if endpoint == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "replay", "username": "replay_bot"}
+        if endpoint == "getFile":
+            return {"file_id": params.get("file_id", ""), "file_unique_id": "replay", "file_path": "replay"}
+        if endpoint.startswith(("send", "edit")):
+            msg = {"message_id": next(self._message_ids), "date": int(time.time()),
+                   "chat": {"id": int(params.get("chat_id") or 0), "type": "private"}}
+            if "text" in params:
+                msg["text"] = params["text"]
+            return msg
+        return True
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+from datetime import date
+
+from sheets import _normalize_branch
+
+# File SQLite lokal untuk snapshot hitungan harian (satu baris per hari × branch × status × jenis)
+HISTORY_DB = os.getenv("HISTORY_DB", "history.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    branch  TEXT    NOT NULL,   -- branch ternormalisasi (lowercase, tanpa spasi)
+    day     TEXT    NOT NULL,   -- YYYY-MM-DD
+    status  TEXT    NOT NULL,
+    jenis   TEXT    NOT NULL,
+    pending INTEGER NOT NULL,   -- 1 = status bukan Complete/Cancel
+    n       INTEGER NOT NULL,
+    PRIMARY KEY (branch, day, status, jenis)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_counts_day ON daily_counts (day, pending);
+"""
+
+
+def _connect(path: str | None = None) -> sqlite3.Connection:
+    conn = sqlite3.connect(path or HISTORY_DB)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def record_day(day: date, rows: list[tuple[str, str, str, bool, int]], path: str | None = None) -> int:
+    """
+    Simpan hitungan satu hari (hasil sheets.status_counts()).
+    Dijalankan ulang di hari yang sama → baris hari itu ditimpa, bukan digandakan.
+    Return: jumlah baris yang ditulis.
+    """
+    d = day.isoformat()
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute("DELETE FROM daily_counts WHERE day = ?", (d,))
+            conn.executemany(
+                "INSERT INTO daily_counts (branch, day, status, jenis, pending, n) VALUES (?, ?, ?, ?, ?, ?)",
+                [(b, d, st, j, int(p), n) for b, st, j, p, n in rows],
+            )
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def pending_trend(start: date, end: date, branch: str | None = None,
+                  path: str | None = None) -> list[tuple[date, int]]:
+    """
+    Total order pending per hari di [start, end] (inklusif), hanya hari yang punya snapshot.
+    Dengan branch, baca lewat primary key (branch, day) → range scan, bukan seluruh tabel.
+    """
+    branch_key = _normalize_branch(branch) if branch else None
+    conn = _connect(path)
+    try:
+        if branch_key:
+            cur = conn.execute(
+                "SELECT day, SUM(n) FROM daily_counts "
+                "WHERE branch = ? AND day BETWEEN ? AND ? AND pending = 1 GROUP BY day ORDER BY day",
+                (branch_key, start.isoformat(), end.isoformat()),
+            )
+        else:
+            cur = conn.execute(
+                "SELECT day, SUM(n) FROM daily_counts "
+                "WHERE day BETWEEN ? AND ? AND pending = 1 GROUP BY day ORDER BY day",
+                (start.isoformat(), end.isoformat()),
+            )
+        return [(date.fromisoformat(d), n) for d, n in cur.fetchall()]
+    finally:
+        conn.close()
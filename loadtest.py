@@ -0,0 +1,179 @@
+"""
+Load test lokal: banyak user Telegram tiruan mengirim /order, /search, /pending dan
+/summarybranch ke Application asli (bot.build_app) dengan Bot API tiruan dan worksheet
+sintetis — tanpa jaringan. Dipakai untuk melihat berapa user bersamaan yang sanggup
+dilayani satu instance sebelum perintah mulai antre.
+
+    python loadtest.py --users 10,50,200 --rate 20 --duration 30
+    python loadtest.py --rows 100000 --sheet-latency 1.5 --api-latency 0.1
+
+Kedatangan update mengikuti proses Poisson dengan laju --rate update/detik (total),
+user dipilih acak dari --users. Laporan: throughput, latensi p50/p95/p99/max, error,
+dan lag event loop (seberapa telat loop membangunkan task yang seharusnya jalan).
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from telegram import Update
+
+import cassette
+import sheets
+from replay import capture_app, feed, latency_stats, print_report
+
+HEADER = ["ORDER_ID", "NO SC", "CUSTOMER_NAME", "STATUS DO", "JENIS ORDER", "ORDER_DATE", "BRANCH"]
+BRANCHES = ["JAMBI", "MUARO JAMBI", "SUNGAI PENUH", "KUALA TUNGKAL", "BANGKO", "MUARA BUNGO"]
+STATUSES = ["Complete", "Completed (PS)", "Cancel", "Pending", "Provisioning", "OGP", "In Progress"]
+JENIS = ["MO", "DO", "RO", "SO", "PDA", "CO", "CN", "AS", "MIGRATE"]
+NAMES = ["Budi", "Ani", "Sari", "Rahmat", "Dewi", "Toko", "CV Maju", "PT Sinar", "Telkom", "Hendra"]
+
+# campuran perintah default (bobot)
+DEFAULT_MIX = {"order": 5, "search": 3, "pending": 1, "summarybranch": 1}
+
+
+def synthetic_rows(n: int, seed: int = 1) -> list[list[str]]:
+    """Isi worksheet sintetis: ~70% Complete/Cancel, tanggal 1 tahun terakhir, format campur."""
+    rnd = random.Random(seed)
+    today = date.today()
+    rows = [HEADER]
+    for i in range(n):
+        d = today - timedelta(days=rnd.randrange(365))
+        rows.append([
+            f"1{i:08d}",
+            f"SC{i:08d}",
+            f"{rnd.choice(NAMES)} {rnd.choice(NAMES)} {i % 997}",
+            rnd.choice(STATUSES[:3]) if rnd.random() < 0.7 else rnd.choice(STATUSES[3:]),
+            rnd.choice(JENIS),
+            d.isoformat() if rnd.random() < 0.5 else d.strftime("%d/%m/%Y"),
+            rnd.choice(BRANCHES),
+        ])
+    return rows
+
+
+def install_worksheets(rows: list[list[str]], latency: float):
+    """Semua sumber (SHEET_SOURCES + tab raw) dijawab dari `rows`, dengan jeda `latency` per baca."""
+    keys = set(sheets.SOURCES) | {(sheets.SHEET_ID, sheets.RAW_SHEET_NAME)}
+    responses = {}
+    for sid, tab in keys:
+        responses[(sid, tab, "get_all_values", None)] = {"data": rows, "elapsed": latency}
+        responses[(sid, tab, "row_count", None)] = {"data": len(rows), "elapsed": 0.0}
+    cassette.install_sheets(responses, delay=latency > 0)
+
+
+def make_command(rnd: random.Random, kind: str, n_rows: int) -> str:
+    if kind == "order":
+        # sebagian besar order ada, sebagian tidak ditemukan
+        i = rnd.randrange(int(n_rows * 1.1) or 1)
+        return f"/order 1{i:08d}"
+    if kind == "search":
+        return f"/search {rnd.choice(NAMES).lower()} {rnd.randrange(997)}"
+    if kind == "pending":
+        return "/pending" if rnd.random() < 0.5 else f"/pending {rnd.choice(BRANCHES)}"
+    return f"/summarybranch {rnd.choice(BRANCHES)}" if rnd.random() < 0.7 else "/summarybranch"
+
+
+def make_update(update_id: int, user_id: int, text: str) -> dict:
+    command = text.split()[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+
+async def _watch_loop_lag(lags: list[float], stop: asyncio.Event, interval: float = 0.05):
+    """Ukur keterlambatan event loop: jarak antara jadwal bangun dan waktu bangun sebenarnya."""
+    while not stop.is_set():
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.monotonic() - started - interval))
+
+
+async def run(users: int, rate: float, duration: float, mix: dict[str, int], rows: list[list[str]],
+              sheet_latency: float = 0.0, api_latency: float = 0.0, seed: int = 1) -> dict:
+    install_worksheets(rows, sheet_latency)
+    request = cassette.CaptureRequest(latency=api_latency)
+    app, errors = capture_app(request)
+    rnd = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+
+    latencies: list[float] = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+    async with app:
+        watcher = asyncio.create_task(_watch_loop_lag(lags, stop))
+        tasks = []
+        t0 = time.monotonic()
+        due = t0
+        update_id = 0
+        while True:
+            due += rnd.expovariate(rate)
+            if due - t0 > duration:
+                break
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            update_id += 1
+            text = make_command(rnd, rnd.choices(kinds, weights)[0], len(rows) - 1)
+            update = Update.de_json(make_update(update_id, 1000 + rnd.randrange(users), text), app.bot)
+            tasks.append(asyncio.create_task(feed(app, update, due, latencies)))
+        await asyncio.gather(*tasks)
+        wall = time.monotonic() - t0
+        stop.set()
+        await watcher
+
+    lag = latency_stats(lags)
+    return {
+        "updates": update_id,
+        "wall": wall,
+        "throughput": update_id / wall if wall else 0.0,
+        "latency_ms": latency_stats(latencies),
+        "errors": len(errors),
+        "api_calls": Counter(endpoint for _, endpoint, _ in request.calls),
+        "loop lag ms": f"p50 {lag['p50']:.1f} | p99 {lag['p99']:.1f} | max {lag['max']:.1f}",
+    }
+
+
+def _parse_mix(raw: str) -> dict[str, int]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lstrip("/")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"perintah tidak dikenal: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load test bot.py dengan user Telegram tiruan.")
+    ap.add_argument("--users", default="10,50,200",
+                    help="jumlah user bersamaan, boleh beberapa dipisah koma (dijalankan bergantian)")
+    ap.add_argument("--rate", type=float, default=10.0, help="update per detik (total semua user)")
+    ap.add_argument("--duration", type=float, default=20.0, help="lama tiap run (detik)")
+    ap.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                    help="bobot perintah, mis. order=5,search=3,pending=1,summarybranch=1")
+    ap.add_argument("--rows", type=int, default=20000, help="jumlah baris worksheet sintetis")
+    ap.add_argument("--sheet-latency", type=float, default=0.0, help="durasi tiap baca Sheets (detik)")
+    ap.add_argument("--api-latency", type=float, default=0.05, help="durasi tiap request Bot API (detik)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rows = synthetic_rows(args.rows, args.seed)
+    for users in (int(u) for u in args.users.split(",")):
+        res = asyncio.run(run(users, args.rate, args.duration, args.mix, rows,
+                              args.sheet_latency, args.api_latency, args.seed))
+        print_report(f"{users} user, {args.rate:g} update/s, {args.rows} baris", res)
+
+
+if __name__ == "__main__":
+    main()
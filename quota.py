@@ -0,0 +1,174 @@
+import os
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import requests
+from gspread.exceptions import APIError
+
+# -----------------------------
+# PRIORITAS
+# -----------------------------
+PRIORITY_INTERACTIVE = 0   # perintah user (/order, /search, ...)
+PRIORITY_BACKGROUND = 1    # job terjadwal (laporan harian, dll.)
+
+# Kuota baca Google Sheets: default 60 request/menit/user (service account)
+READ_QUOTA_PER_MIN = int(os.getenv("SHEETS_READ_QUOTA_PER_MIN", "60"))
+# batas antre untuk perintah interaktif; lebih dari ini → SheetsBusy
+MAX_WAIT_INTERACTIVE = float(os.getenv("SHEETS_MAX_WAIT", "20"))
+MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 32.0
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_priority: ContextVar[int] = ContextVar("sheets_priority", default=PRIORITY_INTERACTIVE)
+
+
+class SheetsBusy(RuntimeError):
+    """Kuota Sheets sedang penuh dan antrean melebihi batas tunggu."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(f"Kuota Google Sheets sedang penuh, coba lagi dalam ~{self.retry_after} detik.")
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Set prioritas semua pemanggilan Sheets di dalam blok ini.
+    Ikut terbawa ke asyncio.to_thread karena memakai contextvars.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def background_priority():
+    return priority(PRIORITY_BACKGROUND)
+
+
+def _status_code(e: Exception) -> int | None:
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return code
+    resp = getattr(e, "response", None)
+    return getattr(resp, "status_code", None)
+
+def _retry_after(e: Exception) -> float | None:
+    resp = getattr(e, "response", None)
+    raw = resp.headers.get("Retry-After") if resp is not None else None
+    try:
+        return float(raw) if raw else None
+    except ValueError:
+        return None
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff dengan jitter (50–100% dari batas atas)."""
+    return min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+class QuotaScheduler:
+    """
+    Penjadwal tunggal untuk semua request ke Sheets API.
+    - sliding window 60 detik untuk menghitung pemakaian kuota
+    - antrean berprioritas: interaktif selalu didahulukan dari job
+    - 429/5xx di-retry dengan backoff + jitter; 429 menahan seluruh antrean sebentar
+    """
+
+    def __init__(self, per_minute: int = READ_QUOTA_PER_MIN, window: float = 60.0):
+        self.per_minute = max(1, per_minute)
+        self.window = window
+        self._cond = threading.Condition()
+        self._granted: deque[float] = deque()
+        self._waiting: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+
+    def _purge(self, now: float):
+        while self._granted and now - self._granted[0] >= self.window:
+            self._granted.popleft()
+
+    def _next_free(self, now: float) -> float:
+        free_at = self._paused_until
+        if len(self._granted) >= self.per_minute:
+            free_at = max(free_at, self._granted[0] + self.window)
+        return max(free_at, now)
+
+    def _acquire(self, prio: int, max_wait: float | None):
+        ticket = (prio, next(self._seq))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            granted = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._purge(now)
+                    free_at = self._next_free(now)
+                    if self._waiting[0] == ticket and free_at <= now:
+                        heapq.heappop(self._waiting)
+                        self._granted.append(now)
+                        granted = True
+                        self._cond.notify_all()
+                        return
+
+                    if max_wait is not None:
+                        # kalau slot berikutnya pun di luar batas tunggu, langsung tolak
+                        waited = now - start
+                        if waited >= max_wait or free_at - start > max_wait:
+                            raise SheetsBusy(free_at - now)
+
+                    timeout = free_at - now if free_at > now else 0.5
+                    self._cond.wait(timeout=min(timeout, 1.0))
+            finally:
+                if not granted:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+
+    def _pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Jalankan fn(*args, **kwargs) sesuai kuota & prioritas konteks saat ini.
+        Untuk prioritas interaktif, antre + jeda retry bersama-sama dibatasi MAX_WAIT_INTERACTIVE;
+        kalau retry berikutnya melewati batas itu → SheetsBusy, bukan menahan thread lebih lama.
+        """
+        prio = _priority.get()
+        deadline = time.monotonic() + MAX_WAIT_INTERACTIVE if prio == PRIORITY_INTERACTIVE else None
+
+        attempt = 0
+        while True:
+            self._acquire(prio, None if deadline is None else max(0.0, deadline - time.monotonic()))
+            try:
+                return fn(*args, **kwargs)
+            except APIError as e:
+                code = _status_code(e)
+                if code not in _RETRY_STATUS or attempt >= MAX_RETRIES:
+                    raise
+                delay = _retry_after(e) or _backoff(attempt)
+                if code == 429:
+                    # kuota habis: tahan semua antrean, bukan cuma request ini
+                    self._pause(delay)
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    raise SheetsBusy(delay) from e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = _backoff(attempt)
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    raise SheetsBusy(delay) from e
+            attempt += 1
+            time.sleep(delay)
+
+
+scheduler = QuotaScheduler()
@@ -0,0 +1,113 @@
+"""
+Putar ulang cassette (lihat cassette.py) ke handler bot.py secara offline, lalu ukur
+throughput & latensi. Dipakai untuk membandingkan perubahan performa dengan trafik yang sama:
+
+    python replay.py cassettes/hari-ini.jsonl                # secepat mungkin
+    python replay.py cassettes/hari-ini.jsonl --speed 10     # 10x kecepatan rekaman
+    python replay.py cassettes/hari-ini.jsonl --no-sheet-delay
+
+Latensi per update = dari jadwal datangnya sampai semua handler-nya selesai
+(termasuk antre di ChatOrderedProcessor, Sheets dari cassette, dan balasan ke Bot API tiruan).
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+
+import cassette
+
+
+def latency_stats(latencies: list[float]) -> dict[str, float]:
+    """p50/p95/p99/max dalam milidetik."""
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    xs = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return xs[min(len(xs) - 1, int(p * len(xs)))] * 1000
+
+    return {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": xs[-1] * 1000}
+
+
+def print_report(title: str, res: dict):
+    lat = res["latency_ms"]
+    print(f"== {title}")
+    print(f"updates    : {res['updates']} dalam {res['wall']:.2f}s → {res['throughput']:.1f} update/s")
+    print(f"latensi ms : p50 {lat['p50']:.1f} | p95 {lat['p95']:.1f} | p99 {lat['p99']:.1f} | max {lat['max']:.1f}")
+    print(f"error      : {res['errors']}")
+    print("bot api    : " + (", ".join(f"{k} {v}" for k, v in sorted(res["api_calls"].items())) or "-"))
+    for k, v in res.items():
+        if k not in ("updates", "wall", "throughput", "latency_ms", "errors", "api_calls"):
+            print(f"{k:<11}: {v}")
+
+
+def capture_app(request: cassette.CaptureRequest) -> tuple[Application, list]:
+    """bot.build_app() dengan Bot API tiruan; error handler ikut menghitung exception handler."""
+    import bot   # impor di sini: bot.py membaca .env & mengimpor sheets saat di-load
+
+    app = bot.build_app(
+        Application.builder().token("0:replay").request(request).get_updates_request(cassette.CaptureRequest())
+    )
+    errors: list = []
+
+    async def count_error(update: object, context: ContextTypes.DEFAULT_TYPE):
+        errors.append(context.error)
+
+    app.add_error_handler(count_error)
+    return app, errors
+
+
+async def feed(app: Application, update: Update, arrival: float, latencies: list[float]):
+    """Proses satu update lewat update processor (sama seperti run_polling) dan catat latensinya."""
+    await app.update_processor.process_update(update, app.process_update(update))
+    latencies.append(time.monotonic() - arrival)
+
+
+async def replay(path: str, speed: float = 0.0, sheet_delay: bool = True) -> dict:
+    events, responses = cassette.load(path)
+    cassette.install_sheets(responses, delay=sheet_delay)
+    request = cassette.CaptureRequest()
+    app, errors = capture_app(request)
+
+    latencies: list[float] = []
+    async with app:
+        tasks = []
+        t0 = time.monotonic()
+        first = events[0]["t"] if events else 0.0
+        for ev in events:
+            due = t0 + (ev["t"] - first) / speed if speed > 0 else time.monotonic()
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            update = Update.de_json(ev["data"], app.bot)
+            tasks.append(asyncio.create_task(feed(app, update, max(due, t0), latencies)))
+        await asyncio.gather(*tasks)
+        wall = time.monotonic() - t0
+
+    return {
+        "updates": len(events),
+        "wall": wall,
+        "throughput": len(events) / wall if wall else 0.0,
+        "latency_ms": latency_stats(latencies),
+        "errors": len(errors),
+        "api_calls": Counter(endpoint for _, endpoint, _ in request.calls),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Putar ulang cassette ke handler bot.py secara offline.")
+    ap.add_argument("cassette")
+    ap.add_argument("--speed", type=float, default=0.0,
+                    help="kelipatan kecepatan rekaman (0 = secepat mungkin)")
+    ap.add_argument("--no-sheet-delay", action="store_true",
+                    help="jawab Sheets seketika, tanpa mengulang durasi aslinya")
+    args = ap.parse_args()
+    res = asyncio.run(replay(args.cassette, args.speed, not args.no_sheet_delay))
+    print_report(args.cassette, res)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Laporan terjadwal yang bisa dikonfigurasi (pengganti laporan pending 10:15 yang di-hardcode).
+
+REPORTS_FILE (default reports.json) berisi list JSON, contoh:
+  [
+    {"name": "pending-jambi", "kind": "pending", "branch": "JAMBI", "days": 7,
+     "schedule": "15 10 * * *", "chats": [-1001234567890]},
+    {"name": "summary-mtd", "kind": "summary", "schedule": "0 17 * * 1-5", "chats": "admins"},
+    {"name": "aging-mingguan", "kind": "aging", "schedule": "0 8 * * 1", "chats": "admins"}
+  ]
+  kind     : "pending" (N hari terakhir; days=0 → semua pending), "summary" (bulan berjalan), "aging"
+  branch   : opsional, None/kosong = semua branch
+  schedule : cron 5 kolom "menit jam tanggal bulan hari" (zona Asia/Jakarta), dukung * , - /
+  chats    : list chat id, atau "admins" = ADMIN_CHAT_IDS
+Tanpa file: satu laporan pending 7 hari pukul 10:15 ke ADMIN_CHAT_IDS (perilaku lama).
+
+Laporan yang jatuh tempo di menit yang sama dihitung bersama (sheets.run_reports, satu kali scan);
+laporan identik (kind, branch, days sama) cukup dihitung & dirender sekali lalu dikirim ke semua chat.
+"""
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+REPORTS_FILE = os.getenv("REPORTS_FILE", "reports.json")
+REPORT_KINDS = ("pending", "summary", "aging")
+PENDING_REPORT_LIMIT = 5000
+
+
+# -----------------------------
+# CRON
+# -----------------------------
+# (min, max) tiap kolom: menit, jam, tanggal, bulan, hari (0/7 = Minggu)
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(expr: str, lo: int, hi: int) -> frozenset[int]:
+    out: set[int] = set()
+    for part in expr.split(","):
+        rng, slash, step_s = part.partition("/")
+        step = int(step_s) if slash else 1
+        if rng == "*":
+            a, b = lo, hi
+        elif "-" in rng:
+            a, b = (int(x) for x in rng.split("-", 1))
+        else:
+            a = int(rng)
+            b = hi if slash else a   # "5/10" = mulai 5, tiap 10
+        if step < 1 or not lo <= a <= b <= hi:
+            raise ValueError(f"di luar rentang {lo}-{hi}: {part!r}")
+        out.update(range(a, b + 1, step))
+    return frozenset(out)
+
+
+class Cron(NamedTuple):
+    minute: frozenset[int]
+    hour: frozenset[int]
+    dom: frozenset[int]
+    month: frozenset[int]
+    dow: frozenset[int]
+    dom_any: bool
+    dow_any: bool
+
+    @classmethod
+    def parse(cls, expr: str) -> "Cron":
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron harus 5 kolom: {expr!r}")
+        m, h, dom, mon, dow = (_parse_field(p, lo, hi) for p, (lo, hi) in zip(parts, _CRON_FIELDS))
+        dow = frozenset(d % 7 for d in dow)
+        return cls(m, h, dom, mon, dow, parts[2] == "*", parts[4] == "*")
+
+    def matches(self, dt: datetime) -> bool:
+        if dt.minute not in self.minute or dt.hour not in self.hour or dt.month not in self.month:
+            return False
+        dom_ok = dt.day in self.dom
+        dow_ok = (dt.weekday() + 1) % 7 in self.dow   # cron: 0 = Minggu
+        # aturan cron standar: kalau tanggal & hari sama-sama dibatasi, cukup salah satu cocok
+        if self.dom_any or self.dow_any:
+            return dom_ok and dow_ok
+        return dom_ok or dow_ok
+
+
+# -----------------------------
+# KONFIGURASI
+# -----------------------------
+class ReportSpec(NamedTuple):
+    name: str
+    kind: str
+    branch: str | None
+    days: int
+    schedule: Cron
+    chats: tuple[int, ...] | None   # None = ADMIN_CHAT_IDS
+
+    def key(self) -> tuple:
+        """Laporan dengan key sama menghasilkan isi yang sama."""
+        branch = self.branch.upper() if self.branch else None
+        return (self.kind, branch, self.days if self.kind == "pending" else 0)
+
+
+DEFAULT_REPORTS = [
+    ReportSpec("pending-7hari", "pending", None, 7, Cron.parse("15 10 * * *"), None),
+]
+
+
+def _spec_from_dict(i: int, d: dict) -> ReportSpec:
+    name = str(d.get("name") or f"report-{i + 1}")
+    kind = str(d.get("kind", "")).strip().lower()
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"kind harus salah satu dari {', '.join(REPORT_KINDS)}")
+    branch = (d.get("branch") or "").strip() or None
+    days = int(d.get("days", 7))
+    if days < 0:
+        raise ValueError("days tidak boleh negatif")
+    schedule = Cron.parse(str(d.get("schedule", "")))
+    chats = d.get("chats", "admins")
+    if chats == "admins":
+        chats = None
+    elif isinstance(chats, list) and chats:
+        chats = tuple(int(c) for c in chats)
+    else:
+        raise ValueError('chats harus list chat id atau "admins"')
+    return ReportSpec(name, kind, branch, days, schedule, chats)
+
+
+def load_reports(path: str | None = None) -> list[ReportSpec]:
+    """Baca konfigurasi laporan dari REPORTS_FILE; file tidak ada → DEFAULT_REPORTS."""
+    path = path or REPORTS_FILE
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except FileNotFoundError:
+        return list(DEFAULT_REPORTS)
+    except ValueError as e:
+        raise RuntimeError(f"{path} bukan JSON yang valid: {e}")
+
+    if not isinstance(raw, list):
+        raise RuntimeError(f"{path} harus berisi list laporan.")
+    specs = []
+    for i, d in enumerate(raw):
+        try:
+            specs.append(_spec_from_dict(i, d))
+        except (TypeError, ValueError, AttributeError) as e:
+            raise RuntimeError(f"Laporan #{i + 1} di {path} tidak valid: {e}")
+    return specs
+
+
+# -----------------------------
+# PENJADWALAN
+# -----------------------------
+def due_reports(specs: list[ReportSpec], now: datetime,
+                admins: list[int]) -> list[tuple[ReportSpec, list[int]]]:
+    """
+    Laporan yang jatuh tempo pada menit `now`, dikelompokkan per isi (ReportSpec.key):
+    [(spec, [chat_id, ...]), ...]. Chat yang sama tidak dikirimi laporan yang sama dua kali.
+    """
+    groups: dict[tuple, tuple[ReportSpec, list[int]]] = {}
+    for spec in specs:
+        if not spec.schedule.matches(now):
+            continue
+        spec_chats = admins if spec.chats is None else spec.chats
+        _, chats = groups.setdefault(spec.key(), (spec, []))
+        chats.extend(c for c in spec_chats if c not in chats)
+    return [(spec, chats) for spec, chats in groups.values() if chats]
+
+
+def period(spec: ReportSpec, today: date) -> tuple[date | None, date | None]:
+    """Rentang tanggal laporan: pending → N hari terakhir, summary → bulan berjalan, aging → semua."""
+    if spec.kind == "pending":
+        if not spec.days:
+            return None, None
+        return today - timedelta(days=spec.days - 1), today
+    if spec.kind == "summary":
+        return today.replace(day=1), today
+    return None, None
+
+
+def request_for(spec: ReportSpec, today: date) -> tuple[str, dict]:
+    """Parameter sheets.run_reports untuk satu laporan."""
+    start, end = period(spec, today)
+    if spec.kind == "pending":
+        return "pending", {"branch": spec.branch, "start": start, "end": end, "limit": PENDING_REPORT_LIMIT}
+    if spec.kind == "summary":
+        return "summary", {"branch": spec.branch, "start": start, "end": end}
+    return "aging", {"branch": spec.branch, "today": today}
@@ -1,13 +1,33 @@
 import os
-from datetime import date
+import sys
+import logging
+import heapq
+import itertools
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import NamedTuple
 from html import escape  # optional, berguna kalau mau log aman
 
 import gspread
+import requests
 from dotenv import load_dotenv
+from google.auth.transport.requests import AuthorizedSession, Request
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
 from dateutil import parser as dateparser
 import re
 
+import sheets_np
+import snapshot_share
+from quota import SheetsBusy, background_priority, scheduler as _quota
+
 load_dotenv()
 SHEET_ID = os.getenv("SHEET_ID")
 
@@ -16,42 +36,180 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive.readonly",
 ]
 
+DEFAULT_WORKSHEET = "Order MODOROSO"
+
+# refresh token sebelum kedaluwarsa supaya request user tidak kena jeda refresh
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+HTTP_POOL_SIZE = int(os.getenv("SHEETS_HTTP_POOL", "10"))
+# baca per blok baris (0 = sekaligus lewat get_all_values); berguna untuk sheet yang sangat besar
+SHEET_PAGE_ROWS = int(os.getenv("SHEET_PAGE_ROWS", "0"))
+SHEET_PAGE_PREFETCH = max(1, int(os.getenv("SHEET_PAGE_PREFETCH", "2")))  # blok yang diambil bersamaan
+
 # -----------------------------
 # CACHING CLIENT & WORKSHEET
 # -----------------------------
 _gc = None
-_ws = None
+_creds = None
+_token_request = None
+_spreadsheets: dict[str, gspread.Spreadsheet] = {}
+_ws_cache: dict[tuple[str, str], gspread.Worksheet] = {}
+_lock = threading.RLock()
+
+def _pooled_adapter(pool_size: int) -> HTTPAdapter:
+    """Adapter HTTP dengan pool koneksi keep-alive."""
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+def _ensure_fresh_token():
+    """Refresh token service account kalau sisa umurnya < TOKEN_REFRESH_MARGIN."""
+    creds = _creds
+    if creds is None:
+        return
+    expiry = creds.expiry  # naive UTC
+    if creds.token and expiry and expiry - datetime.utcnow() > TOKEN_REFRESH_MARGIN:
+        return
+    with _lock:
+        expiry = creds.expiry
+        if creds.token and expiry and expiry - datetime.utcnow() > TOKEN_REFRESH_MARGIN:
+            return
+        creds.refresh(_token_request)
 
 def _get_client():
-    global _gc
+    """
+    Client gspread tunggal dengan satu AuthorizedSession (HTTP keep-alive)
+    yang dipakai bersama oleh semua pemanggilan.
+    """
+    global _gc, _creds, _token_request
     if _gc:
+        _ensure_fresh_token()
         return _gc
-    creds = Credentials.from_service_account_file("service_account.json", scopes=SCOPES)
-    _gc = gspread.authorize(creds)
+    with _lock:
+        if _gc:
+            return _gc
+        creds = Credentials.from_service_account_file("service_account.json", scopes=SCOPES)
+
+        # session khusus untuk refresh token, juga keep-alive
+        token_session = requests.Session()
+        token_session.mount("https://", _pooled_adapter(2))
+        token_request = Request(session=token_session)
+
+        session = AuthorizedSession(creds, auth_request=token_request)
+        session.mount("https://", _pooled_adapter(HTTP_POOL_SIZE))
+
+        _creds, _token_request = creds, token_request
+        _ensure_fresh_token()
+        _gc = gspread.Client(auth=creds, session=session)
     return _gc
 
-def get_ws(worksheet_name: str | None = None):
+def get_ws(worksheet_name: str | None = None, sheet_id: str | None = None):
     """
     Dapatkan worksheet.
     Default: 'Order MODOROSO'.
     Bisa pilih worksheet lain dengan nama tab: get_ws("NamaTab").
+    Handle spreadsheet & worksheet di-cache per (sheet_id, nama tab).
     """
-    global _ws
-    default_name = "Order MODOROSO"
-
-    # kalau _ws sudah diset dan user tidak minta tab lain → pakai cache
-    if _ws and worksheet_name is None:
-        return _ws
+    key = (sheet_id or SHEET_ID, worksheet_name or DEFAULT_WORKSHEET)
+    ws = _ws_cache.get(key)
+    if ws is not None:
+        return ws
 
     gc = _get_client()
-    sh = gc.open_by_key(SHEET_ID)
+    sh = _spreadsheets.get(key[0])
+    if sh is None:
+        # open_by_key & worksheet() sama-sama membaca metadata → lewat penjadwal kuota
+        sh = _quota.call(gc.open_by_key, key[0])
+        with _lock:
+            sh = _spreadsheets.setdefault(key[0], sh)
+    ws = _quota.call(sh.worksheet, key[1])
+    with _lock:
+        ws = _ws_cache.setdefault(key, ws)
+    return ws
 
-    # kalau user kasih nama, pakai itu; kalau tidak, pakai default_name
-    ws = sh.worksheet(worksheet_name or default_name)
+def invalidate_ws(worksheet_name: str | None = None, sheet_id: str | None = None):
+    """Buang handle worksheet (dan spreadsheet-nya) dari cache, mis. setelah error/tab di-rename."""
+    sid = sheet_id or SHEET_ID
+    with _lock:
+        _ws_cache.pop((sid, worksheet_name or DEFAULT_WORKSHEET), None)
+        _spreadsheets.pop(sid, None)
 
-    if worksheet_name is None:
-        _ws = ws
-    return ws
+def _handle_is_stale(e: Exception) -> bool:
+    """
+    True kalau error berarti handle spreadsheet/worksheet di cache tidak berlaku lagi
+    (tab di-rename/dihapus, sheet tidak ada). Kuota (429) dan 5xx bukan.
+    """
+    if isinstance(e, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)):
+        return True
+    if isinstance(e, gspread.exceptions.APIError):
+        code = getattr(e, "code", None)
+        if not isinstance(code, int):
+            code = getattr(getattr(e, "response", None), "status_code", None)
+        return code in (400, 404)
+    return False
+
+def _read_rows(worksheet_name: str | None = None, sheet_id: str | None = None) -> list[list[str]]:
+    """
+    Baca semua nilai worksheet lewat handle yang di-cache.
+    Kalau gagal karena handle-nya salah (tab di-rename/dihapus), handle di-invalidate supaya
+    pemanggilan berikutnya membuka ulang tab-nya; 429/5xx/koneksi tidak membuang handle.
+    """
+    try:
+        ws = get_ws(worksheet_name, sheet_id)
+        _ensure_fresh_token()
+        return _quota.call(ws.get_all_values)
+    except Exception as e:
+        if _handle_is_stale(e):
+            invalidate_ws(worksheet_name, sheet_id)
+        raise
+
+_page_pool = ThreadPoolExecutor(max_workers=SHEET_PAGE_PREFETCH, thread_name_prefix="sheets-page")
+
+def _iter_rows_paged(worksheet_name: str | None = None, sheet_id: str | None = None,
+                     page_rows: int | None = None):
+    """
+    Seperti _read_rows, tapi per blok `page_rows` baris (range "a:b") dan berupa generator:
+    maks. SHEET_PAGE_PREFETCH blok diambil di background selagi blok sebelumnya di-parse,
+    jadi memori puncak ~ beberapa blok, bukan seluruh sheet.
+    Urutan & isi baris sama dengan get_all_values(): baris kosong di tengah tetap ada,
+    baris kosong di ujung dibuang.
+    """
+    page_rows = page_rows or SHEET_PAGE_ROWS
+    futures: deque = deque()
+    next_start = 1
+    try:
+        ws = get_ws(worksheet_name, sheet_id)
+        _ensure_fresh_token()
+        last_row = max(1, ws.row_count)
+
+        def submit():
+            nonlocal next_start
+            rng = f"{next_start}:{next_start + page_rows - 1}"
+            # context disalin per blok → prioritas (interaktif/background) ikut ke thread prefetch
+            futures.append(_page_pool.submit(copy_context().run, _quota.call, ws.get_values, rng))
+            next_start += page_rows
+
+        while next_start <= last_row and len(futures) < SHEET_PAGE_PREFETCH:
+            submit()
+        blank = 0
+        while futures:
+            page = futures.popleft().result()
+            if page == [[]]:
+                page = []
+            # pesan blok berikutnya dulu supaya jaringan jalan selagi blok ini di-parse;
+            # blok terakhir penuh → sheet mungkin sudah bertambah sejak handle dibuka
+            if next_start <= last_row or (len(page) == page_rows and not futures):
+                submit()
+            if page:
+                if blank:
+                    yield from itertools.repeat([], blank)
+                    blank = 0
+                yield from page
+            blank += page_rows - len(page)
+    except Exception as e:
+        if _handle_is_stale(e):
+            invalidate_ws(worksheet_name, sheet_id)
+        raise
+    finally:
+        for f in futures:
+            f.cancel()
 
 
 # -----------------------------
@@ -91,199 +249,600 @@ def _to_date(cell: str | None) -> date | None:
     except Exception:
         return None
 
-def _sort_by_date(rows: list[dict], key: str = "ORDER_DATE") -> list[dict]:
-    """Urutkan list dict berdasarkan kolom tanggal (terlama ke terbaru)."""
-    return sorted(rows, key=lambda r: _to_date(r.get(key, "")) or date.min)
+@lru_cache(maxsize=4096)
+def _normalize_branch(name: str) -> str:
+    # buang spasi & lowercase agar "MUARO JAMBI" == "muarojambi"
+    return re.sub(r"\s+", "", (name or "").strip()).lower()
+
+def _date_key(r: "Order") -> date:
+    return r.order_day or date.min
 
 
 # -----------------------------
-# FUNGSI FITUR
+# SNAPSHOT DATA (baris sheet yang sudah di-parse)
 # -----------------------------
-def find_order(order_key: str):
+SNAPSHOT_TTL = float(os.getenv("SHEET_SNAPSHOT_TTL", "60"))  # detik
+
+# SHEETS_ENGINE=numpy → filter pending pakai mask NumPy (butuh paket numpy)
+USE_NUMPY = os.getenv("SHEETS_ENGINE", "python").strip().lower() == "numpy"
+if USE_NUMPY and not sheets_np.available():
+    logging.warning("SHEETS_ENGINE=numpy tapi numpy tidak terpasang; pakai engine Python.")
+    USE_NUMPY = False
+
+class Order(NamedTuple):
     """
-    Cari order berdasarkan kolom ORDER_ID atau No SC.
-    Return dict atau None.
+    Satu baris order. Berbasis tuple (tanpa __dict__) supaya 200rb baris tetap hemat memori;
+    kolom berkardinalitas rendah (status, jenis, branch, tanggal) di-intern saat parsing.
     """
-    ws = get_ws()
-    rows = ws.get_all_values()
-    header = {h.strip().lower(): i for i, h in enumerate(rows[0])}
-
-    if "order_id" not in header or "no sc" not in header:
-        raise RuntimeError("Kolom 'ORDER_ID' atau 'No SC' tidak ditemukan di sheet.")
+    customer_name: str
+    order_id: str
+    no_sc: str
+    status_do: str
+    jenis_order: str
+    order_date: str          # teks asli dari sheet (untuk ditampilkan)
+    branch: str
+    order_day: date | None   # ORDER_DATE yang sudah di-parse
+
+class DoneOrder(NamedTuple):
+    """
+    Order yang sudah Complete/Cancel (partisi "dingin"): hanya kolom untuk find_order/search.
+    Branch & tanggal ter-parse cukup disimpan sebagai hitungan di _Snapshot.done_counts.
+    """
+    customer_name: str
+    order_id: str
+    no_sc: str
+    status_do: str
+    jenis_order: str
+    order_date: str
+
+class _Snapshot:
+    """
+    Isi satu tab, dipisah dua partisi:
+      - hot  : order pending, lengkap (Order) + index per branch
+      - cold : order selesai (DoneOrder) + done_counts {(branch, status, jenis, tanggal): n}
+    `rows` tetap memuat semuanya dalam urutan sheet (objeknya dipakai bersama, bukan salinan).
+    """
+    __slots__ = ("header", "rows", "hot", "hot_by_branch", "done_counts", "version", "loaded_at",
+                 "_key_index", "_prefix_index", "_arrays")
+
+    def __init__(self, header: dict[str, int], rows: list, hot: list[Order],
+                 done_counts: dict[tuple, int], version: int):
+        self.header = header
+        self.rows = rows
+        self.hot = hot
+        self.done_counts = done_counts
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+        by_branch: dict[str, list[Order]] = {}
+        for r in hot:
+            by_branch.setdefault(_normalize_branch(r.branch), []).append(r)
+        self.hot_by_branch = by_branch
+        self._key_index = None
+        self._prefix_index = None
+        self._arrays = None
+
+    def require(self, columns: list[str], where: str = ""):
+        missing = [c for c in columns if c not in self.header]
+        if missing:
+            raise RuntimeError(f"Kolom hilang di sheet{where}: {', '.join(missing)}")
+
+    def key_index(self) -> dict[str, "Order | DoneOrder"]:
+        """
+        ORDER_ID/No SC → baris pertama yang memuatnya (sama dengan urutan scan find_order).
+        Dibangun sekali per snapshot (lihat warm), sebelum snapshot dipakai query.
+        """
+        idx = self._key_index
+        if idx is None:
+            idx = {}
+            for r in self.rows:
+                idx.setdefault(r.order_id, r)
+                idx.setdefault(r.no_sc, r)
+            self._key_index = idx
+        return idx
+
+    def prefix_index(self) -> tuple[list[str], "array"]:
+        """
+        Index prefix (array terurut + bisect) atas ORDER_ID, No SC dan tiap kata nama customer
+        (huruf kecil), jadi "budi" cocok ke "PT BUDI JAYA". Kata yang sama di banyak baris
+        memakai satu objek string; posisi baris disimpan di array int, bukan list.
+        Return (terms, posisi baris di self.rows), keduanya sejajar.
+        """
+        idx = self._prefix_index
+        if idx is None:
+            words: dict[str, str] = {}
+            terms: list[str] = []
+            refs = array("I")
+            for pos, r in enumerate(self.rows):
+                for t in (r.order_id, r.no_sc):
+                    if t:
+                        lt = t.lower()
+                        terms.append(t if lt == t else lt)
+                        refs.append(pos)
+                for w in r.customer_name.lower().split():
+                    terms.append(words.setdefault(w, w))
+                    refs.append(pos)
+            # sort stabil: term sama tetap urut posisi baris
+            order = sorted(range(len(terms)), key=terms.__getitem__)
+            idx = self._prefix_index = ([terms[i] for i in order], array("I", (refs[i] for i in order)))
+        return idx
+
+    def warm(self):
+        """Bangun index lookup (ORDER_ID/No SC & prefix) sekarang, bukan saat query pertama."""
+        self.key_index()
+        self.prefix_index()
+
+    def arrays(self) -> "sheets_np.PendingArrays":
+        """Kolom partisi hot dalam bentuk array NumPy (hanya dipakai kalau USE_NUMPY)."""
+        if self._arrays is None:
+            self._arrays = sheets_np.PendingArrays(self.hot, _normalize_branch)
+        return self._arrays
+
+    def pending(self, branch_key: str | None = None) -> list[Order]:
+        """Order pending (sheet order); kalau branch_key diisi pakai index branch."""
+        if branch_key is None:
+            return self.hot
+        return self.hot_by_branch.get(branch_key, [])
+
+_REQUIRED = ["customer_name", "order_id", "no sc", "status do", "jenis order", "order_date"]
+
+_snapshots: dict[tuple[str, str], _Snapshot] = {}
+_snapshot_locks: dict[tuple[str, str], threading.Lock] = {}
+_versions = itertools.count(1)
+
+def _build_snapshot(values) -> _Snapshot:
+    """
+    Ubah hasil get_all_values() (atau iterator baris dari _iter_rows_paged) menjadi
+    snapshot hot/cold yang ringkas. Baris dikonsumsi satu per satu.
+    """
+    it = iter(values)
+    first = next(it, None)
+    if first is None:
+        return _Snapshot({}, [], [], {}, next(_versions))
+    header = {h.strip().lower(): i for i, h in enumerate(first)}
+
+    def col(name: str) -> int:
+        return header.get(name, -1)
+
+    i_name, i_order, i_nosc = col("customer_name"), col("order_id"), col("no sc")
+    i_status, i_jenis, i_date = col("status do"), col("jenis order"), col("order_date")
+    i_branch = col("branch") if "branch" in header else col("datel")
+
+    intern = sys.intern
+    days: dict[str, date | None] = {}   # tanggal berulang cukup di-parse sekali
+    done: dict[str, bool] = {}          # begitu juga status
+    rows: list = []
+    hot: list[Order] = []
+    done_counts: dict[tuple, int] = {}
+    for r in it:
+        n = len(r)
+        status = intern(r[i_status].strip()) if -1 < i_status < n else ""
+        jenis = intern(r[i_jenis].strip()) if -1 < i_jenis < n else ""
+        branch = intern(r[i_branch].strip()) if -1 < i_branch < n else ""
+        raw_date = intern(r[i_date].strip()) if -1 < i_date < n else ""
+        day = days.get(raw_date, date.min)
+        if day is date.min:
+            day = days[raw_date] = _to_date(raw_date)
+        is_done = done.get(status)
+        if is_done is None:
+            is_done = done[status] = _is_done(status)
+
+        name = r[i_name].strip() if -1 < i_name < n else ""
+        order_id = r[i_order].strip() if -1 < i_order < n else ""
+        no_sc = r[i_nosc].strip() if -1 < i_nosc < n else ""
+        if is_done:
+            rows.append(DoneOrder(name, order_id, no_sc, status, jenis, raw_date))
+            k = (branch, status, jenis, day)
+            done_counts[k] = done_counts.get(k, 0) + 1
+        else:
+            o = Order(name, order_id, no_sc, status, jenis, raw_date, branch, day)
+            rows.append(o)
+            hot.append(o)
+    return _Snapshot(header, rows, hot, done_counts, next(_versions))
+
+def _snapshot_lock(key: tuple[str, str]) -> threading.Lock:
+    with _lock:
+        return _snapshot_locks.setdefault(key, threading.Lock())
+
+def _load_snapshot(key: tuple[str, str], publish: bool = True) -> _Snapshot:
+    """Ambil tab dari Sheets, parse, simpan ke cache (dan publish kalau proses ini publisher)."""
+    if SHEET_PAGE_ROWS > 0:
+        values = _iter_rows_paged(key[1], key[0])
+    else:
+        values = _read_rows(key[1], key[0])
+    snap = _build_snapshot(values)
+    # index dibangun sebelum snapshot dipasang: ketikan inline pertama setelah refresh
+    # tidak ikut menunggu pembangunan index (snapshot lama tetap dipakai sampai saat ini).
+    # Di publisher dilewati: index dibangun di tiap worker; kalau publisher ikut menjawab user,
+    # index-nya dibangun saat pertama dipakai.
+    if snapshot_share.SNAPSHOT_ROLE != "publisher":
+        snap.warm()
+    _snapshots[key] = snap
+    if publish and snapshot_share.SNAPSHOT_ROLE == "publisher":
+        publish_snapshots()
+    return snap
+
+def _refresh_in_background(key: tuple[str, str]):
+    """Muat ulang snapshot di thread pool; dilewati kalau sudah ada yang sedang memuat."""
+    def run():
+        lock = _snapshot_lock(key)
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            with background_priority():
+                _load_snapshot(key)
+        except Exception:
+            logging.exception("Gagal refresh snapshot %s", key)
+        finally:
+            lock.release()
+    _source_pool.submit(run)
+
+def _snapshot(worksheet_name: str | None = None, sheet_id: str | None = None,
+              allow_stale: bool = False, publish: bool = True) -> _Snapshot:
+    """
+    Snapshot ter-parse untuk satu tab, di-cache selama SNAPSHOT_TTL detik.
+    Hanya satu thread yang mengambil ulang data; yang lain menunggu hasilnya.
+    allow_stale=True: kalau sudah ada snapshot (walau kedaluwarsa) langsung dipakai,
+    refresh jalan di background — untuk jalur yang harus cepat seperti inline query.
+    Di proses worker (SNAPSHOT_ROLE=worker) data dibaca dari snapshot bersama.
+    publish=False: pemanggil yang publish sendiri (mis. sekali setelah muat paralel).
+    """
+    key = (sheet_id or SHEET_ID, worksheet_name or DEFAULT_WORKSHEET)
+    if _shared is not None:
+        snap = _shared_snapshot(key)
+        if snap is not None:
+            return snap
+        # publisher belum menulis tab ini → sementara ambil langsung dari Sheets
+
+    snap = _snapshots.get(key)
+    if snap is not None:
+        if time.monotonic() - snap.loaded_at < SNAPSHOT_TTL:
+            return snap
+        if allow_stale:
+            _refresh_in_background(key)
+            return snap
+
+    with _snapshot_lock(key):
+        snap = _snapshots.get(key)
+        if snap is not None and time.monotonic() - snap.loaded_at < SNAPSHOT_TTL:
+            return snap
+        snap = _load_snapshot(key, publish)
+    return snap
+
+def invalidate_snapshot(worksheet_name: str | None = None, sheet_id: str | None = None):
+    """Paksa snapshot tab ini diambil ulang pada pemanggilan berikutnya."""
+    _snapshots.pop((sheet_id or SHEET_ID, worksheet_name or DEFAULT_WORKSHEET), None)
 
-    idx_orderid = header["order_id"]
-    idx_nosc = header["no sc"]
 
-    for r in rows[1:]:
-        val_orderid = r[idx_orderid].strip() if len(r) > idx_orderid else ""
-        val_nosc = r[idx_nosc].strip() if len(r) > idx_nosc else ""
+# -----------------------------
+# SNAPSHOT BERSAMA ANTAR PROSES (lihat snapshot_share.py)
+# -----------------------------
+_shared = snapshot_share.SharedSnapshot() if snapshot_share.SNAPSHOT_ROLE == "worker" else None
+_shared_snaps: dict[tuple[str, str], _Snapshot] = {}
+_shared_stamp = 0                       # time.time_ns() saat publisher menulis _shared_snaps
+_shared_lock = threading.Lock()         # melindungi _shared_snaps & _shared_stamp
+_shared_load_lock = threading.Lock()    # satu thread yang memuat ulang file sekaligus
+_shared_stale_warned = 0                # stempel terakhir yang sudah diperingatkan
+
+# snapshot bersama lebih tua dari ini (publisher mati/macet) dianggap tidak ada:
+# worker kembali mengambil langsung dari Sheets sampai publisher menulis lagi
+SHARED_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(5 * SNAPSHOT_TTL)))  # detik
+
+def _to_plain(snap: _Snapshot) -> tuple:
+    """Snapshot → tipe dasar yang bisa di-marshal (tanggal jadi ordinal, 0 = tanpa tanggal)."""
+    rows = [
+        r[:7] + (r.order_day.toordinal() if r.order_day else 0,) if type(r) is Order else tuple(r)
+        for r in snap.rows
+    ]
+    done = [(b, st, j, d.toordinal() if d else 0, n) for (b, st, j, d), n in snap.done_counts.items()]
+    return list(snap.header.items()), rows, done
+
+def _from_plain(plain: tuple) -> _Snapshot:
+    header_items, rows_plain, done_plain = plain
+    days: dict[int, date | None] = {0: None}
+
+    def day(o: int) -> date | None:
+        d = days.get(o, date.min)
+        if d is date.min:
+            d = days[o] = date.fromordinal(o)
+        return d
 
-        if order_key.strip() in (val_orderid, val_nosc):
-            return {
-                "ORDER_ID": val_orderid,
-                "NO_SC": val_nosc,
-                "STATUS_DO": r[header.get("status do", idx_orderid)],
-                "CUSTOMER_NAME": r[header.get("customer_name", idx_orderid)],
-                "JENIS_ORDER": r[header.get("jenis order", idx_orderid)],
-                "ORDER_DATE": r[header.get("order_date", idx_orderid)],
-            }
-    return None
+    rows: list = []
+    hot: list[Order] = []
+    for t in rows_plain:
+        if len(t) == 8:
+            o = Order(t[0], t[1], t[2], t[3], t[4], t[5], t[6], day(t[7]))
+            rows.append(o)
+            hot.append(o)
+        else:
+            rows.append(DoneOrder(*t))
+    done_counts = {(b, st, j, day(o)): n for b, st, j, o, n in done_plain}
+    return _Snapshot(dict(header_items), rows, hot, done_counts, next(_versions))
 
+_publish_lock = threading.Lock()
 
-def search_by_name(query: str, limit: int = 50):
+def publish_snapshots() -> int:
     """
-    Cari order berdasarkan CUSTOMER_NAME (case-insensitive, substring).
-    Return: list[dict] maksimal `limit`.
-    """
-    ws = get_ws()
-    rows = ws.get_all_values()
-    if not rows:
-        return []
-
-    header = {h.strip().lower(): i for i, h in enumerate(rows[0])}
-    required = ["customer_name", "order_id", "no sc", "status do", "jenis order", "order_date"]
-    missing = [c for c in required if c not in header]
-    if missing:
-        raise RuntimeError(f"Kolom hilang di sheet: {', '.join(missing)}")
-
-    idx_name = header["customer_name"]
-    idx_order = header["order_id"]
-    idx_nosc = header["no sc"]
-    idx_status = header["status do"]
-    idx_jenis = header["jenis order"]
-    idx_date = header["order_date"]
+    Tulis semua snapshot yang ada di cache ke file bersama. Return: stempel versi.
+    Satu penulis sekaligus per proses, supaya file yang dipasang terakhir memuat cache terbaru.
+    """
+    with _publish_lock:
+        payload = {f"{sid}\t{tab}": _to_plain(snap) for (sid, tab), snap in list(_snapshots.items())}
+        return snapshot_share.publish(payload)
+
+def _reload_shared(seen: int):
+    """Muat ulang file bersama; index dibangun dulu, baru dipasang di bawah _shared_lock."""
+    global _shared_snaps, _shared_stamp
+    with _shared_load_lock:
+        if _shared_stamp != seen:   # sudah dimuat thread lain selagi menunggu
+            return
+        loaded = _shared.load()
+        if loaded is None:
+            return
+        stamp, payload = loaded
+        snaps = {}
+        for k, plain in payload.items():
+            sid, _, tab = k.partition("\t")
+            snaps[(sid, tab)] = snap = _from_plain(plain)
+            snap.warm()
+        with _shared_lock:
+            _shared_snaps, _shared_stamp = snaps, stamp
+
+def _shared_snapshot(key: tuple[str, str]) -> _Snapshot | None:
+    """
+    Worker: snapshot tab dari file bersama; diganti seluruhnya begitu stempelnya berubah.
+    None kalau publisher belum menulis tab ini, atau terakhir menulis lebih dari SHARED_MAX_AGE lalu.
+    """
+    global _shared_stale_warned
+    # stempel dibaca sebelum changed(): load() mencatat file sebelum index selesai dibangun,
+    # jadi selama muat pertama changed() sudah False — yang belum punya data ikut menunggu
+    seen = _shared_stamp
+    if not seen or _shared.changed():
+        _reload_shared(seen)
+    with _shared_lock:
+        snaps, stamp = _shared_snaps, _shared_stamp
+    age = time.time() - stamp / 1e9
+    if stamp and age > SHARED_MAX_AGE:
+        if _shared_stale_warned != stamp:
+            _shared_stale_warned = stamp
+            logging.warning("Snapshot bersama sudah %.0f detik tidak diperbarui (batas %.0f); "
+                            "sementara ambil langsung dari Google Sheets.", age, SHARED_MAX_AGE)
+        return None
+    return snaps.get(key)
 
-    q = _norm(query)
-    results = []
-    for r in rows[1:]:
-        name = r[idx_name].strip() if len(r) > idx_name else ""
-        if q in name.lower():
-            results.append({
-                "CUSTOMER_NAME": name,
-                "ORDER_ID": r[idx_order] if len(r) > idx_order else "",
-                "NO_SC": r[idx_nosc] if len(r) > idx_nosc else "",
-                "STATUS_DO": r[idx_status] if len(r) > idx_status else "",
-                "JENIS_ORDER": r[idx_jenis] if len(r) > idx_jenis else "",
-                "ORDER_DATE": r[idx_date] if len(r) > idx_date else "",
-            })
-            if len(results) >= limit:
-                break
-    return results
 
+# -----------------------------
+# SUMBER DATA (tab aktif + arsip)
+# -----------------------------
+# SHEET_SOURCES="Order MODOROSO; Arsip 2024; Order 2023@<sheet_id lain>"
+# Urutan = prioritas (find_order mengambil yang pertama ketemu). Kosong → hanya tab default.
+_source_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SHEET_SOURCE_WORKERS", "4")),
+                                  thread_name_prefix="sheet-source")
 
-def list_not_done(keyword: str | None = None, limit: int = 2000):
-    """
-    Ambil order yang Status DO-nya BUKAN Complete/Cancel (case-insensitive).
-    Jika `keyword` diisi, filter juga yang mengandung keyword di CUSTOMER_NAME / ORDER_ID / No SC.
-    Return: list[dict] tersortir tanggal (terlama→terbaru), maksimal `limit`.
-    """
-    ws = get_ws()
-    rows = ws.get_all_values()
-    if not rows:
-        return []
-
-    header = {h.strip().lower(): i for i, h in enumerate(rows[0])}
-    required = ["order_id", "no sc", "status do", "jenis order", "order_date", "customer_name"]
-    missing = [c for c in required if c not in header]
-    if missing:
-        raise RuntimeError(f"Kolom hilang di sheet: {', '.join(missing)}")
-
-    idx_name   = header["customer_name"]
-    idx_order  = header["order_id"]
-    idx_nosc   = header["no sc"]
-    idx_status = header["status do"]
-    idx_jenis  = header["jenis order"]
-    idx_date   = header["order_date"]
-
-    q = _norm(keyword) if keyword else None
+def _parse_sources(raw: str | None) -> list[tuple[str, str]]:
     out = []
-    for r in rows[1:]:
-        status = r[idx_status] if len(r) > idx_status else ""
-        if _is_done(status):
+    for part in (raw or "").replace("\n", ";").split(";"):
+        part = part.strip()
+        if not part:
             continue
+        tab, _, sid = part.rpartition("@") if "@" in part else (part, "", "")
+        out.append((sid.strip() or SHEET_ID, tab.strip() or DEFAULT_WORKSHEET))
+    return out or [(SHEET_ID, DEFAULT_WORKSHEET)]
 
-        name = r[idx_name] if len(r) > idx_name else ""
-        order_id = r[idx_order] if len(r) > idx_order else ""
-        no_sc = r[idx_nosc] if len(r) > idx_nosc else ""
+SOURCES = _parse_sources(os.getenv("SHEET_SOURCES"))
+
+def _all_snapshots(allow_stale: bool = False) -> list[_Snapshot]:
+    """
+    Snapshot semua sumber, diambil paralel di thread pool
+    (latensi total ≈ sumber paling lambat, bukan jumlah semuanya).
+    """
+    if len(SOURCES) == 1:
+        sid, tab = SOURCES[0]
+        return [_snapshot(tab, sid, allow_stale)]
+    # copy_context supaya prioritas kuota pemanggil ikut terbawa ke thread pool;
+    # publisher cukup publish sekali setelah semua sumber selesai, bukan per thread
+    before = [_snapshots.get((sid, tab)) for sid, tab in SOURCES]
+    futures = [_source_pool.submit(copy_context().run, _snapshot, tab, sid, allow_stale, False)
+               for sid, tab in SOURCES]
+    snaps = [f.result() for f in futures]
+    if snapshot_share.SNAPSHOT_ROLE == "publisher" and any(a is not b for a, b in zip(before, snaps)):
+        publish_snapshots()
+    return snaps
+
+def _merge_by_date(parts: list[list["Order"]], limit: int, newest_first: bool = False) -> list["Order"]:
+    """Gabung beberapa list yang sudah urut tanggal secara streaming (heapq.merge)."""
+    if len(parts) == 1:
+        return parts[0][:limit]
+    merged = heapq.merge(*parts, key=_date_key, reverse=newest_first)
+    return list(itertools.islice(merged, limit))
+
+def _top_by_date(rows, limit: int, newest_first: bool = False) -> list["Order"]:
+    """
+    `limit` order terlama (atau terbaru) dari iterable, urut tanggal.
+    Heap berukuran `limit`: O(n log k), memori tetap; urutan sheet dipertahankan untuk tanggal sama.
+    """
+    if newest_first:
+        return heapq.nlargest(limit, rows, key=_date_key)
+    return heapq.nsmallest(limit, rows, key=_date_key)
+
+def _pending_filter(start: date | None, end: date | None, q: str | None):
+    """Predikat Python untuk rentang tanggal + keyword (CUSTOMER_NAME / ORDER_ID / No SC)."""
+    def keep(r: Order) -> bool:
+        d = r.order_day
+        if start and (not d or d < start):
+            return False
+        if end and (not d or d > end):
+            return False
 
         if q:
-            hay = f"{name} {order_id} {no_sc}".lower()
+            hay = f"{r.customer_name} {r.order_id} {r.no_sc}".lower()
             if q not in hay:
-                continue
+                return False
+        return True
+    return keep
 
-        out.append({
-            "CUSTOMER_NAME": name,
-            "ORDER_ID": order_id,
-            "NO_SC": no_sc,
-            "STATUS_DO": status,
-            "JENIS_ORDER": r[idx_jenis] if len(r) > idx_jenis else "",
-            "ORDER_DATE": r[idx_date] if len(r) > idx_date else "",
-        })
-        if len(out) >= limit:
-            break
+def _pending_across_sources(limit: int, branch: str | None = None, start: date | None = None,
+                            end: date | None = None, keyword: str | None = None,
+                            newest_first: bool = False) -> list["Order"]:
+    """
+    Ambil `limit` order pending terlama (atau terbaru kalau newest_first) yang lolos filter
+    branch / rentang tanggal / keyword dari semua sumber.
+    Tiap sumber diseleksi top-K (heap, atau mask NumPy kalau engine aktif) lalu digabung streaming.
+    """
+    want = _normalize_branch(branch) if branch else None
+    q = _norm(keyword) or None
+    parts = []
+    for snap in _all_snapshots():
+        if not snap.header:
+            continue
+        snap.require(_REQUIRED)
+        # tab tanpa kolom branch/datel tidak difilter branch
+        want_branch = want if ("branch" in snap.header or "datel" in snap.header) else None
+        if USE_NUMPY:
+            keep = _pending_filter(None, None, q) if q else None
+            parts.append(snap.arrays().select(snap.hot, limit, want_branch, start, end, keep, newest_first))
+            continue
+        # hanya partisi hot (pending) yang di-scan
+        rows = snap.pending(want_branch)
+        if start or end or q:
+            rows = filter(_pending_filter(start, end, q), rows)
+        parts.append(_top_by_date(rows, limit, newest_first))
+    return _merge_by_date(parts, limit, newest_first) if parts else []
+
+
+# -----------------------------
+# FUNGSI FITUR
+# -----------------------------
+def find_order(order_key: str) -> Order | DoneOrder | None:
+    """
+    Cari order berdasarkan kolom ORDER_ID atau No SC.
+    Return Order (pending) / DoneOrder (Complete/Cancel) atau None.
+    """
+    return find_orders([order_key])[order_key.strip()]
 
-    return _sort_by_date(out)
 
+def find_orders(order_keys: list[str]) -> dict[str, Order | DoneOrder | None]:
+    """
+    Cari banyak ORDER_ID / No SC sekaligus (mode bulk /order).
+    Semua key diselesaikan lewat index per snapshot, bukan scan per key.
+    Return: {key (sudah di-strip): Order/DoneOrder atau None}, urutan sesuai input.
+    """
+    keys = [k.strip() for k in order_keys]
+    found: dict[str, Order | DoneOrder | None] = dict.fromkeys(keys)
+    todo = set(keys)
+    for snap in _all_snapshots():
+        if not todo:
+            break
+        if not snap.header:
+            continue   # tab kosong (mis. arsip belum diisi) dilewati, sama seperti search_by_name
+        if "order_id" not in snap.header or "no sc" not in snap.header:
+            raise RuntimeError("Kolom 'ORDER_ID' atau 'No SC' tidak ditemukan di sheet.")
+        idx = snap.key_index()
+        for k in list(todo):
+            r = idx.get(k)
+            if r is not None:
+                found[k] = r
+                todo.discard(k)
+    return found
+
+
+def _name_has_phrase(name: str, q: str) -> bool:
+    """True kalau q (sudah dinormalisasi) muncul di nama mulai dari awal salah satu katanya."""
+    nm = " " + name.lower()
+    if nm.find(" " + q) >= 0:
+        return True
+    # jalur lambat hanya untuk nama dengan spasi ganda / tab
+    return nm != " ".join(nm.split()) and (" " + " ".join(nm.split())).find(" " + q) >= 0
 
-def list_pending_in_range(start: date | None, end: date | None, limit: int = 2000):
+def prefix_search(text: str, limit: int = 20, offset: int = 0) -> tuple[list[Order | DoneOrder], bool]:
     """
-    Ambil order pending (Status DO ≠ Complete/Cancel) dengan ORDER_DATE di [start, end] (inklusif).
-    Jika start atau end None → tanpa batas di sisi itu.
-    Return: list[dict] tersortir tanggal (terlama→terbaru), maksimal `limit`.
-    """
-    ws = get_ws()
-    rows = ws.get_all_values()
-    if not rows:
-        return []
-
-    header = {h.strip().lower(): i for i, h in enumerate(rows[0])}
-    required = ["order_id", "no sc", "status do", "jenis order", "order_date", "customer_name"]
-    missing = [c for c in required if c not in header]
-    if missing:
-        raise RuntimeError(f"Kolom hilang di sheet: {', '.join(missing)}")
-
-    idx_name   = header["customer_name"]
-    idx_order  = header["order_id"]
-    idx_nosc   = header["no sc"]
-    idx_status = header["status do"]
-    idx_jenis  = header["jenis order"]
-    idx_date   = header["order_date"]
+    Typeahead: order yang ORDER_ID / No SC / nama customer (atau salah satu katanya)
+    diawali `text`. Hanya memakai snapshot di memori (boleh sedikit basi), tanpa fetch sheet
+    kecuali belum ada snapshot sama sekali.
+    Return: (hasil halaman [offset, offset+limit), masih_ada_halaman_berikutnya).
+    """
+    q = " ".join(text.lower().split())
+    if not q:
+        return [], False
+
+    # satu kata: semua term berawalan q. Beberapa kata: kandidat diambil dari kata yang paling
+    # jarang (kata utuh, atau kata terakhir sebagai prefix), lalu dicek di nama bahwa q muncul
+    # mulai dari batas kata (mis. "budi ja" → "pt budi jaya").
+    words = q.split(" ")
+    want = offset + limit + 1
+    out: list[Order | DoneOrder] = []
+    for snap in _all_snapshots(allow_stale=True):
+        terms, refs = snap.prefix_index()
+        lo, hi = 0, len(terms) + 1
+        for j, w in enumerate(words):
+            a = bisect_left(terms, w)
+            b = bisect_right(terms, w) if j < len(words) - 1 else bisect_left(terms, w + "\U0010ffff")
+            if b - a < hi - lo:
+                lo, hi = a, b
+        seen: set[int] = set()
+        for i in range(lo, hi):
+            pos = refs[i]
+            if pos in seen:
+                continue
+            seen.add(pos)
+            r = snap.rows[pos]
+            if len(words) > 1 and not _name_has_phrase(r.customer_name, q):
+                continue
+            out.append(r)
+            if len(out) >= want:
+                return out[offset:offset + limit], True
+    return out[offset:offset + limit], False
 
-    out = []
-    for r in rows[1:]:
-        status = r[idx_status] if len(r) > idx_status else ""
-        if _is_done(status):
-            continue
 
-        d = _to_date(r[idx_date] if len(r) > idx_date else "")
-        if start and (not d or d < start):
-            continue
-        if end and (not d or d > end):
+def search_by_name(query: str, limit: int = 50) -> list[Order | DoneOrder]:
+    """
+    Cari order berdasarkan CUSTOMER_NAME (case-insensitive, substring).
+    Return: list[Order | DoneOrder] maksimal `limit`.
+    """
+    q = _norm(query)
+    results = []
+    for snap in _all_snapshots():
+        if not snap.header:
             continue
+        snap.require(_REQUIRED)
+        for r in snap.rows:
+            if q in r.customer_name.lower():
+                results.append(r)
+                if len(results) >= limit:
+                    return results
+    return results
 
-        out.append({
-            "CUSTOMER_NAME": r[idx_name] if len(r) > idx_name else "",
-            "ORDER_ID": r[idx_order] if len(r) > idx_order else "",
-            "NO_SC": r[idx_nosc] if len(r) > idx_nosc else "",
-            "STATUS_DO": status,
-            "JENIS_ORDER": r[idx_jenis] if len(r) > idx_jenis else "",
-            "ORDER_DATE": r[idx_date] if len(r) > idx_date else "",
-        })
-        if len(out) >= limit:
-            break
 
-    return _sort_by_date(out)
+def list_not_done(keyword: str | None = None, limit: int = 2000, newest_first: bool = False) -> list[Order]:
+    """
+    Ambil order yang Status DO-nya BUKAN Complete/Cancel (case-insensitive).
+    Jika `keyword` diisi, filter juga yang mengandung keyword di CUSTOMER_NAME / ORDER_ID / No SC.
+    Return: `limit` order terlama, tersortir tanggal (terlama→terbaru).
+    newest_first=True → `limit` order terbaru, terbaru→terlama.
+    """
+    return _pending_across_sources(limit, keyword=keyword, newest_first=newest_first)
 
 
-def list_pending_in_month(year: int, month: int, limit: int = 2000):
+def list_pending_in_range(start: date | None, end: date | None, limit: int = 2000,
+                          newest_first: bool = False) -> list[Order]:
+    """
+    Ambil order pending (Status DO ≠ Complete/Cancel) dengan ORDER_DATE di [start, end] (inklusif).
+    Jika start atau end None → tanpa batas di sisi itu.
+    Return: `limit` order terlama, tersortir tanggal (terlama→terbaru); newest_first=kebalikannya.
+    """
+    return _pending_across_sources(limit, start=start, end=end, newest_first=newest_first)
+
+
+def list_pending_in_month(year: int, month: int, limit: int = 2000,
+                          newest_first: bool = False) -> list[Order]:
     """
     Ambil order pending di bulan (year, month) tertentu.
-    Return: list[dict] tersortir tanggal (terlama→terbaru), maksimal `limit`.
+    Return: `limit` order terlama, tersortir tanggal (terlama→terbaru); newest_first=kebalikannya.
     """
     from calendar import monthrange
     start = date(year, month, 1)
     end = date(year, month, monthrange(year, month)[1])
-    return list_pending_in_range(start, end, limit=limit)
+    return list_pending_in_range(start, end, limit=limit, newest_first=newest_first)
 
 def list_pending(
     keyword: str | None = None,
@@ -292,95 +851,28 @@ def list_pending(
     year: int | None = None,
     month: int | None = None,
     branch: str | None = None,          # NEW: filter DATEL/Branch
-    limit: int = 2000
-):
+    limit: int = 2000,
+    newest_first: bool = False,
+) -> list[Order]:
     """
     Ambil order pending (Status DO ≠ Complete/Cancel).
     Filter opsional:
       - branch/DATEL (nama persis di kolom 'branch' / 'datel' jika ada)
       - keyword (CUSTOMER_NAME / ORDER_ID / No SC)
       - rentang tanggal (start–end) atau bulan (year, month)
+    Return: `limit` order terlama (terlama→terbaru); newest_first=True → `limit` terbaru.
     """
     from calendar import monthrange
     if year and month:
         start = date(year, month, 1)
         end = date(year, month, monthrange(year, month)[1])
 
-    ws = get_ws()
-    rows = ws.get_all_values()
-    if not rows:
-        return []
-
-    header = {h.strip().lower(): i for i, h in enumerate(rows[0])}
-    required = ["order_id", "no sc", "status do", "jenis order", "order_date", "customer_name"]
-    missing = [c for c in required if c not in header]
-    if missing:
-        raise RuntimeError(f"Kolom hilang di sheet: {', '.join(missing)}")
-
-    # cari kolom branch/datel jika ada
-    idx_branch = None
-    for cand in ("branch", "datel"):
-        if cand in header:
-            idx_branch = header[cand]
-            break
-
-    idx_name   = header["customer_name"]
-    idx_order  = header["order_id"]
-    idx_nosc   = header["no sc"]
-    idx_status = header["status do"]
-    idx_jenis  = header["jenis order"]
-    idx_date   = header["order_date"]
-
-    q = (keyword or "").strip().lower() or None
-    want_branch = None
-    if branch:
-        # normalisasi: buang spasi & lowercase agar "MUARO JAMBI" == "muarojambi"
-        want_branch = re.sub(r"\s+", "", branch.strip().lower())
-
-    out = []
-    for r in rows[1:]:
-        status = r[idx_status] if len(r) > idx_status else ""
-        if _is_done(status):
-            continue
-
-        # filter branch kalau kolomnya ada & user minta
-        if idx_branch is not None and want_branch:
-            val = r[idx_branch] if len(r) > idx_branch else ""
-            norm = re.sub(r"\s+", "", val.strip().lower())
-            if norm != want_branch:
-                continue
-
-        d = _to_date(r[idx_date] if len(r) > idx_date else "")
-        if start and (not d or d < start):
-            continue
-        if end and (not d or d > end):
-            continue
-
-        name = r[idx_name] if len(r) > idx_name else ""
-        order_id = r[idx_order] if len(r) > idx_order else ""
-        no_sc = r[idx_nosc] if len(r) > idx_nosc else ""
-
-        if q:
-            hay = f"{name} {order_id} {no_sc}".lower()
-            if q not in hay:
-                continue
-
-        out.append({
-            "CUSTOMER_NAME": name,
-            "ORDER_ID": order_id,
-            "NO_SC": no_sc,
-            "STATUS_DO": status,
-            "JENIS_ORDER": r[idx_jenis] if len(r) > idx_jenis else "",
-            "ORDER_DATE": r[idx_date] if len(r) > idx_date else "",
-        })
-        if len(out) >= limit:
-            break
-
-    return _sort_by_date(out)
+    return _pending_across_sources(limit, branch=branch, start=start, end=end, keyword=keyword,
+                                   newest_first=newest_first)
 
 
 # Map kolom yang kita butuhkan dari sheet raw
-RAW_SHEET_NAME = "Order MODOROSO"
+RAW_SHEET_NAME = DEFAULT_WORKSHEET
 COL_DATEL = "branch"
 COL_STATUS = "status do"         # pastikan sama persis seperti header di sheet
 COL_JENIS = "jenis order"        # MO/DO/RO/SO/PDA/CO/CN/AS/MIGRATE
@@ -388,23 +880,6 @@ COL_ORDER_DATE = "order_date"
 
 _JENIS_LIST = ["MO","DO","RO","SO","PDA","CO","CN","AS","MIGRATE"]
 
-def _parse_date(cell: str | None) -> date | None:
-    if not cell:
-        return None
-    s = str(cell).strip()
-    if not s or s in {"-", "0"}:
-        return None
-    try:
-        d = dateparser.parse(s, dayfirst=True, fuzzy=True).date()
-        if d.year < 1971:
-            return None
-        return d
-    except Exception:
-        return None
-    
-def _normalize_branch(name: str) -> str:
-    return re.sub(r"\s+", "", (name or "").strip()).lower()
-
 
 def summarize_orders(branch: str | None = None, start: date | None = None, end: date | None = None):
     """
@@ -420,61 +895,314 @@ def summarize_orders(branch: str | None = None, start: date | None = None, end:
         "grand_total": N
       }
     """
-    ws = get_ws(RAW_SHEET_NAME)
-    rows = ws.get_all_values()
-    if not rows:
-        return {"per_status": {}, "per_status_by_jenis": {}, "totals_by_jenis": {}, "grand_total": 0}
-
-    header = {h.strip().lower(): i for i, h in enumerate(rows[0])}
-    required = [COL_DATEL, COL_STATUS, COL_JENIS, COL_ORDER_DATE]
-    missing = [c for c in required if c not in header]
-    if missing:
-        raise RuntimeError(f"Kolom hilang di sheet '{RAW_SHEET_NAME}': {', '.join(missing)}")
-
-    i_datel = header[COL_DATEL]
-    i_status = header[COL_STATUS]
-    i_jenis = header[COL_JENIS]
-    i_date = header[COL_ORDER_DATE]
-
-    per_status: dict[str,int] = {}
-    per_status_by_jenis: dict[str,dict[str,int]] = {}
-    totals_by_jenis: dict[str,int] = {j: 0 for j in _JENIS_LIST}
-    grand_total = 0
-
-    want_branch = _normalize_branch(branch) if branch else None
-
-    for r in rows[1:]:
-        datel = r[i_datel].strip() if len(r) > i_datel else ""
-        datel_norm = _normalize_branch(datel)
-        if want_branch and datel_norm != want_branch:
-            continue
-
-        d = _parse_date(r[i_date] if len(r) > i_date else "")
-        if start and (not d or d < start):
-            continue
-        if end and (not d or d > end):
-            continue
+    snap = _snapshot(RAW_SHEET_NAME)
+    return _single_pass([_SummaryAcc(snap, branch, start, end)], [snap])[0]
+
+
+class _SummaryAcc:
+    """Akumulator summarize_orders: partisi hot per baris + done_counts (cold) yang sudah teragregasi."""
+    wants_done = True
+
+    def __init__(self, snap: _Snapshot, branch: str | None, start: date | None, end: date | None):
+        self.snap = snap
+        self.want = _normalize_branch(branch) if branch else None
+        self.start, self.end = start, end
+        self.per_status: dict[str,int] = {}
+        self.per_status_by_jenis: dict[str,dict[str,int]] = {}
+        self.totals_by_jenis: dict[str,int] = {j: 0 for j in _JENIS_LIST}
+        self.grand_total = 0
+
+    def begin(self, snap: _Snapshot):
+        if snap is not self.snap or not snap.header:
+            return False
+        snap.require([COL_DATEL, COL_STATUS, COL_JENIS, COL_ORDER_DATE], f" '{RAW_SHEET_NAME}'")
+        return self.want
+
+    def _in_range(self, d: date | None) -> bool:
+        if self.start and (not d or d < self.start):
+            return False
+        if self.end and (not d or d > self.end):
+            return False
+        return True
 
-        status = (r[i_status].strip() if len(r) > i_status else "") or "(blank)"
-        jenis = (r[i_jenis].strip().upper() if len(r) > i_jenis else "")
+    def _add(self, status: str, jenis: str, n: int):
+        status = status or "(blank)"
+        jenis = jenis.upper()
         if jenis not in _JENIS_LIST:
             jenis = "(OTHER)"
 
         # akumulasi
-        per_status[status] = per_status.get(status, 0) + 1
-        per_status_by_jenis.setdefault(status, {})
-        per_status_by_jenis[status][jenis] = per_status_by_jenis[status].get(jenis, 0) + 1
+        self.per_status[status] = self.per_status.get(status, 0) + n
+        by_jenis = self.per_status_by_jenis.setdefault(status, {})
+        by_jenis[jenis] = by_jenis.get(jenis, 0) + n
+        self.totals_by_jenis[jenis] = self.totals_by_jenis.get(jenis, 0) + n
+        self.grand_total += n
+
+    def feed(self, r: Order):
+        if self._in_range(r.order_day):
+            self._add(r.status_do, r.jenis_order, 1)
+
+    def feed_done(self, status: str, jenis: str, d: date | None, n: int):
+        if self._in_range(d):
+            self._add(status, jenis, n)
+
+    def result(self):
+        if not self.snap.header:
+            return {"per_status": {}, "per_status_by_jenis": {}, "totals_by_jenis": {}, "grand_total": 0}
+        return {
+            "per_status": dict(sorted(self.per_status.items(), key=lambda x: (-x[1], x[0]))),
+            "per_status_by_jenis": self.per_status_by_jenis,
+            "totals_by_jenis": self.totals_by_jenis,
+            "grand_total": self.grand_total,
+        }
+
+
+# -----------------------------
+# AGING PENDING (umur order per bucket)
+# -----------------------------
+AGING_BUCKETS = [  # (min hari, max hari inklusif / None = tanpa batas, label)
+    (0, 3, "0-3 hari"),
+    (4, 7, "4-7 hari"),
+    (8, 14, "8-14 hari"),
+    (15, 30, "15-30 hari"),
+    (31, None, ">30 hari"),
+]
+AGING_UNDATED = "tanpa tanggal"
+
+# (versi snapshot, {(branch, today): hasil}) — seluruh tuple diganti sekaligus saat data berubah
+_aging_cache: tuple[tuple, dict[tuple, dict]] = ((), {})
+
+def _aging_bucket(age: int) -> str:
+    for lo, hi, label in AGING_BUCKETS:
+        if hi is None or age <= hi:
+            return label
+    return AGING_BUCKETS[-1][2]
+
+class _AgingAcc:
+    """Akumulator pending_aging: satu kali jalan di partisi hot semua sumber."""
+    wants_done = False
+
+    def __init__(self, snaps: list[_Snapshot], branch: str | None, today: date):
+        self.snap_ids = {id(s) for s in snaps}
+        self.want = _normalize_branch(branch) if branch else None
+        self.today = today
+        self.labels = [b[2] for b in AGING_BUCKETS] + [AGING_UNDATED]
+        self.totals = dict.fromkeys(self.labels, 0)
+        self.by_branch: dict[str, dict[str, int]] = {}
+        self.by_jenis: dict[str, dict[str, int]] = {}
+        self.oldest: dict[str, Order] = {}
+        self.branch_names: dict[str, str] = {}   # key ternormalisasi → nama tampil pertama
+        # umur → label, dihitung sekali per tanggal berbeda
+        self.label_of: dict[date | None, str] = {None: AGING_UNDATED}
+        self.t = today.toordinal()
+
+    def begin(self, snap: _Snapshot):
+        if id(snap) not in self.snap_ids or not snap.header:
+            return False
+        snap.require(_REQUIRED)
+        return self.want if ("branch" in snap.header or "datel" in snap.header) else None
+
+    def feed(self, r: Order):
+        d = r.order_day
+        label = self.label_of.get(d)
+        if label is None:
+            label = self.label_of[d] = _aging_bucket(max(0, self.t - d.toordinal()))
+
+        self.totals[label] += 1
+        bname = self.branch_names.setdefault(_normalize_branch(r.branch), r.branch or "(kosong)")
+        row = self.by_branch.get(bname)
+        if row is None:
+            row = self.by_branch[bname] = dict.fromkeys(self.labels, 0)
+        row[label] += 1
+        jenis = r.jenis_order.upper() or "(kosong)"
+        row = self.by_jenis.get(jenis)
+        if row is None:
+            row = self.by_jenis[jenis] = dict.fromkeys(self.labels, 0)
+        row[label] += 1
+
+        if d is not None:
+            cur = self.oldest.get(label)
+            if cur is None or d < cur.order_day:
+                self.oldest[label] = r
+
+    def result(self):
+        return {
+            "today": self.today,
+            "buckets": self.labels,
+            "totals": self.totals,
+            "by_branch": dict(sorted(self.by_branch.items())),
+            "by_jenis": dict(sorted(self.by_jenis.items())),
+            "oldest": self.oldest,
+            "grand_total": sum(self.totals.values()),
+        }
+
+def pending_aging(branch: str | None = None, today: date | None = None):
+    """
+    Histogram umur order pending (hari sejak ORDER_DATE) per bucket AGING_BUCKETS,
+    dipecah per branch dan per jenis order, sekali jalan di partisi hot semua sumber.
+    Hasil di-cache per versi data, jadi pemanggilan ulang tanpa data baru gratis.
+    Return:
+      {
+        "today": date,
+        "buckets": [label, ...],                      # urutan tampil (+ AGING_UNDATED di akhir)
+        "totals": {label: n},
+        "by_branch": {branch: {label: n}},
+        "by_jenis": {jenis: {label: n}},
+        "oldest": {label: Order},                     # order tertua per bucket
+        "grand_total": N
+      }
+    """
+    today = today or date.today()
+    want = _normalize_branch(branch) if branch else None
+    snaps = [s for s in _all_snapshots() if s.header]
+    global _aging_cache
+    versions = tuple(s.version for s in snaps)
+    cached_versions, entries = _aging_cache
+    if cached_versions == versions:
+        hit = entries.get((want, today))
+        if hit is not None:
+            return hit
+    else:
+        entries = {}
+
+    res = _single_pass([_AgingAcc(snaps, branch, today)], snaps)[0]
+    # cache cukup untuk versi data terbaru: versi baru → dict baru, dipasang dengan satu assignment
+    # (tidak ada clear/iterasi yang bisa bentrok dengan thread handler lain)
+    entries[(want, today)] = res
+    _aging_cache = (versions, entries)
+    return res
 
-        if jenis in totals_by_jenis:
-            totals_by_jenis[jenis] += 1
-        else:
-            totals_by_jenis[jenis] = totals_by_jenis.get(jenis, 0) + 1
 
-        grand_total += 1
+# -----------------------------
+# HITUNGAN HARIAN (untuk history / tren)
+# -----------------------------
+def status_counts() -> list[tuple[str, str, str, bool, int]]:
+    """
+    Hitungan order saat ini per (branch ternormalisasi, status, jenis) dari semua sumber.
+    Partisi cold diambil dari done_counts yang sudah teragregasi; hanya partisi hot yang di-scan.
+    Return: [(branch, status, jenis, pending?, n), ...]
+    """
+    counts: dict[tuple[str, str, str], int] = {}
+    for snap in _all_snapshots():
+        for r in snap.hot:
+            k = (_normalize_branch(r.branch), r.status_do, r.jenis_order.upper())
+            counts[k] = counts.get(k, 0) + 1
+        for (b, status, jenis, _d), n in snap.done_counts.items():
+            k = (_normalize_branch(b), status, jenis.upper())
+            counts[k] = counts.get(k, 0) + n
+    return [(b, st, j, not _is_done(st), n) for (b, st, j), n in counts.items()]
+
+
+# -----------------------------
+# SINKRON (proses publisher)
+# -----------------------------
+def refresh_and_publish() -> int:
+    """
+    Ambil ulang semua sumber + tab summary secara paralel, lalu publish sekali ke file bersama.
+    Dipakai snapshot_sync.py. Return: stempel versi yang ditulis.
+    """
+    keys = list(dict.fromkeys(SOURCES + [(SHEET_ID, RAW_SHEET_NAME)]))
+
+    def load(key: tuple[str, str]):
+        with _snapshot_lock(key):
+            _load_snapshot(key, publish=False)
+
+    futures = [_source_pool.submit(copy_context().run, load, k) for k in keys]
+    for f in futures:
+        f.result()
+    return publish_snapshots()
 
-    return {
-        "per_status": dict(sorted(per_status.items(), key=lambda x: (-x[1], x[0]))),
-        "per_status_by_jenis": per_status_by_jenis,
-        "totals_by_jenis": totals_by_jenis,
-        "grand_total": grand_total,
-    }
\ No newline at end of file
+
+# -----------------------------
+# LAPORAN TERJADWAL (banyak laporan, satu kali scan)
+# -----------------------------
+class _PendingAcc:
+    """Akumulator daftar pending (branch + rentang tanggal), hasil = `limit` terlama."""
+    wants_done = False
+
+    def __init__(self, snaps: list[_Snapshot], branch: str | None, start: date | None,
+                 end: date | None, limit: int):
+        self.snap_ids = {id(s) for s in snaps}
+        self.want = _normalize_branch(branch) if branch else None
+        self.keep = _pending_filter(start, end, None)
+        self.limit = limit
+        self.rows: list[Order] = []
+
+    def begin(self, snap: _Snapshot):
+        if id(snap) not in self.snap_ids or not snap.header:
+            return False
+        snap.require(_REQUIRED)
+        return self.want if ("branch" in snap.header or "datel" in snap.header) else None
+
+    def feed(self, r: Order):
+        if self.keep(r):
+            self.rows.append(r)
+
+    def result(self) -> list[Order]:
+        # urutan sumber lalu sheet dipertahankan untuk tanggal sama (= heapq.merge per sumber)
+        return _top_by_date(self.rows, self.limit)
+
+
+def _single_pass(accs: list, snaps: list[_Snapshot]) -> list:
+    """
+    Umpankan partisi hot (dan done_counts bagi yang butuh) tiap snapshot ke semua akumulator
+    dalam satu kali jalan. Kalau semua akumulator aktif minta branch yang sama, pakai index branch.
+    """
+    for snap in snaps:
+        active = []
+        for a in accs:
+            k = a.begin(snap)
+            if k is not False:
+                active.append((a, k))
+        if not active:
+            continue
+
+        keys = {k for _, k in active}
+        if len(keys) == 1:
+            rows = snap.pending(next(iter(keys)))
+            feeds = [a.feed for a, _ in active]
+            for r in rows:
+                for feed in feeds:
+                    feed(r)
+        else:
+            for r in snap.hot:
+                rk = _normalize_branch(r.branch)
+                for a, k in active:
+                    if k is None or k == rk:
+                        a.feed(r)
+
+        done = [(a, k) for a, k in active if a.wants_done]
+        if done:
+            for (b, status, jenis, d), n in snap.done_counts.items():
+                bk = _normalize_branch(b)
+                for a, k in done:
+                    if k is None or k == bk:
+                        a.feed_done(status, jenis, d, n)
+    return [a.result() for a in accs]
+
+
+def run_reports(requests: list[tuple[str, dict]]) -> list:
+    """
+    Hitung beberapa laporan sekaligus dari satu set snapshot dan satu kali scan.
+    requests: [(jenis, parameter), ...]
+      ("pending", {"branch", "start", "end", "limit"})  → list[Order] (sama dengan list_pending)
+      ("summary", {"branch", "start", "end"})           → dict (sama dengan summarize_orders)
+      ("aging",   {"branch", "today"})                  → dict (sama dengan pending_aging)
+    Return: hasil dengan urutan yang sama dengan `requests`.
+    """
+    sources = _all_snapshots()
+    raw = _snapshot(RAW_SHEET_NAME) if any(kind == "summary" for kind, _ in requests) else None
+    snaps = sources + ([raw] if raw is not None and all(raw is not s for s in sources) else [])
+
+    accs = []
+    for kind, p in requests:
+        if kind == "pending":
+            accs.append(_PendingAcc(sources, p.get("branch"), p.get("start"), p.get("end"),
+                                    p.get("limit", 5000)))
+        elif kind == "summary":
+            accs.append(_SummaryAcc(raw, p.get("branch"), p.get("start"), p.get("end")))
+        elif kind == "aging":
+            accs.append(_AgingAcc(sources, p.get("branch"), p.get("today") or date.today()))
+        else:
+            raise ValueError(f"Jenis laporan tidak dikenal: {kind}")
+    return _single_pass(accs, snaps)
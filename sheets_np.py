@@ -0,0 +1,74 @@
+"""
+Engine filter pending berbasis NumPy (opsional, aktifkan dengan SHEETS_ENGINE=numpy).
+
+Kolom partisi hot (hanya order pending) disimpan sebagai array:
+  - ords         : ORDER_DATE sebagai ordinal (0 = tanpa tanggal)
+  - branch_codes : kode kategori branch ternormalisasi
+Filter digabung sebagai boolean mask lalu diurutkan dengan argsort stabil,
+sehingga hasilnya identik dengan jalur Python murni (termasuk urutan tanggal sama).
+"""
+try:
+    import numpy as np
+except ImportError:  # numpy tidak wajib; sheets.py kembali ke jalur Python
+    np = None
+
+from datetime import date
+
+
+def available() -> bool:
+    return np is not None
+
+
+class PendingArrays:
+    __slots__ = ("ords", "branch_codes", "branch_ids")
+
+    def __init__(self, rows, normalize_branch):
+        n = len(rows)
+        branch_ids: dict[str, int] = {}
+        ords = np.zeros(n, dtype=np.int32)
+        branch_codes = np.empty(n, dtype=np.int32)
+        for i, r in enumerate(rows):
+            if r.order_day is not None:
+                ords[i] = r.order_day.toordinal()
+            b = normalize_branch(r.branch)
+            branch_codes[i] = branch_ids.setdefault(b, len(branch_ids))
+        self.ords = ords
+        self.branch_codes = branch_codes
+        self.branch_ids = branch_ids
+
+    def mask(self, branch_key: str | None = None, start: date | None = None, end: date | None = None):
+        """Boolean mask untuk baris yang lolos filter branch & rentang tanggal."""
+        m = np.ones(len(self.ords), dtype=bool)
+        if branch_key is not None:
+            code = self.branch_ids.get(branch_key)
+            if code is None:
+                return np.zeros_like(m)
+            m &= self.branch_codes == code
+        if start is not None:
+            m &= self.ords >= start.toordinal()   # tanpa tanggal (0) otomatis gugur
+        if end is not None:
+            m &= (self.ords != 0) & (self.ords <= end.toordinal())
+        return m
+
+    def select(self, rows, limit: int, branch_key: str | None = None, start: date | None = None,
+               end: date | None = None, keep=None, newest_first: bool = False) -> list:
+        """
+        `limit` baris terlama (atau terbaru) yang lolos filter, urut tanggal.
+        `keep(row)` (mis. keyword) dicek di Python, hanya pada kandidat yang sudah terurut.
+        """
+        idx = np.flatnonzero(self.mask(branch_key, start, end))
+        if not len(idx):
+            return []
+        key = self.ords[idx]
+        # argsort stabil: tanggal sama tetap urutan sheet (sama seperti heapq.nsmallest/nlargest)
+        order = idx[np.argsort(-key if newest_first else key, kind="stable")]
+        if keep is None:
+            return [rows[i] for i in order[:limit].tolist()]
+        out = []
+        for i in order.tolist():
+            r = rows[i]
+            if keep(r):
+                out.append(r)
+                if len(out) >= limit:
+                    break
+        return out
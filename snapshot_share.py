@@ -0,0 +1,94 @@
+"""
+Berbagi snapshot sheet antar proses bot (mis. satu proses polling + satu proses laporan).
+
+Satu proses "publisher" (snapshot_sync.py, atau bot dengan SNAPSHOT_ROLE=publisher)
+mengambil data dari Google Sheets lalu menulis snapshot ter-parse ke SNAPSHOT_FILE.
+Proses "worker" (SNAPSHOT_ROLE=worker) tidak pernah memanggil Sheets API: cukup
+memetakan file itu (mmap) dan membaca ulang hanya kalau stempel versinya berubah.
+
+Format file: [magic 4B][format 4B][stamp 8B][payload marshal]
+stamp = time.time_ns() saat publish, dipakai worker untuk menilai umur snapshot.
+Ditulis ke file sementara lalu os.replace → pembaca tidak pernah melihat file setengah jadi.
+"""
+import mmap
+import marshal
+import os
+import struct
+import tempfile
+import time
+
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE", "/dev/shm/sodomoro-snapshot.bin")
+SNAPSHOT_ROLE = os.getenv("SNAPSHOT_ROLE", "").strip().lower()   # "", "publisher", "worker"
+CHECK_INTERVAL = float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "1"))  # detik antar cek stempel
+
+_MAGIC = b"SDMS"
+_FORMAT = 1
+_HEADER = struct.Struct("<4sIQ")
+
+
+def publish(payload: dict, path: str | None = None) -> int:
+    """Tulis payload (hanya tipe yang didukung marshal) secara atomik. Return: stempel versi."""
+    path = path or SNAPSHOT_FILE
+    stamp = time.time_ns()
+    # nama sementara unik per panggilan: penulis lain (thread/proses) tidak berbagi file setengah jadi
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                               suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _FORMAT, stamp))
+            f.write(marshal.dumps(payload, 4))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return stamp
+
+
+class SharedSnapshot:
+    """
+    Pembaca sisi worker. stamp() murah (stat + baca 16 byte lewat mmap);
+    payload hanya di-unmarshal langsung dari halaman mmap saat stempel berubah.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or SNAPSHOT_FILE
+        self._stamp = None
+        self._stat = None
+        self._checked_at = 0.0
+
+    def changed(self) -> bool:
+        """True kalau file sudah diganti publisher sejak load() terakhir (dicek maks. tiap CHECK_INTERVAL)."""
+        now = time.monotonic()
+        if self._stamp is not None and now - self._checked_at < CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_ino, st.st_mtime_ns, st.st_size) != self._stat
+
+    def load(self) -> tuple[int, dict] | None:
+        """(stempel, payload) terbaru, atau None kalau publisher belum pernah menulis."""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            st = os.fstat(f.fileno())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, fmt, stamp = _HEADER.unpack_from(mm, 0)
+                if magic != _MAGIC or fmt != _FORMAT:
+                    raise RuntimeError(f"Format snapshot bersama tidak dikenal: {self.path}")
+                view = memoryview(mm)[_HEADER.size:]
+                try:
+                    payload = marshal.loads(view)
+                finally:
+                    view.release()
+        self._stamp = stamp
+        self._stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self._checked_at = time.monotonic()
+        return stamp, payload
@@ -0,0 +1,34 @@
+"""
+Proses sinkron tunggal: ambil data dari Google Sheets dan publish ke SNAPSHOT_FILE.
+Jalankan sekali per mesin, lalu jalankan bot dengan SNAPSHOT_ROLE=worker:
+
+    python snapshot_sync.py
+    SNAPSHOT_ROLE=worker python bot.py
+"""
+import os
+import time
+import logging
+
+os.environ["SNAPSHOT_ROLE"] = "publisher"   # harus diset sebelum import sheets
+
+import sheets
+from quota import background_priority
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    interval = sheets.SNAPSHOT_TTL
+    while True:
+        started = time.monotonic()
+        try:
+            with background_priority():
+                stamp = sheets.refresh_and_publish()
+            logging.info("snapshot dipublish (stamp=%d) dalam %.1fs", stamp, time.monotonic() - started)
+        except Exception:
+            logging.exception("Gagal sinkron snapshot")
+        time.sleep(max(1.0, interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    main()
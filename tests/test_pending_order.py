@@ -0,0 +1,62 @@
+"""
+list_pending dengan limit harus memberi `limit` order pending terlama (atau terbaru) dari
+semua sumber, bukan `limit` baris pertama di sheet — termasuk baris tanpa tanggal.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import sheets
+
+HEADER = ["ORDER_ID", "NO SC", "CUSTOMER_NAME", "STATUS DO", "JENIS ORDER", "ORDER_DATE", "BRANCH"]
+
+
+def _rows(n: int, seed: int, prefix: str) -> list[list[str]]:
+    """Tanggal acak (tidak urut), sebagian kosong, sebagian Complete."""
+    rnd = random.Random(seed)
+    rows = [HEADER]
+    for i in range(n):
+        d = date(2025, 1, 1) + timedelta(days=rnd.randrange(60))   # banyak tanggal kembar
+        rows.append([
+            f"{prefix}{i:05d}", f"SC{prefix}{i:05d}", f"Customer {i}",
+            rnd.choice(["Pending", "Pending", "OGP", "Complete"]), "MO",
+            "" if rnd.random() < 0.1 else d.strftime("%d/%m/%Y"), "JAMBI",
+        ])
+    return rows
+
+
+def _expected(sources_rows: list[list[list[str]]], limit: int, newest_first: bool) -> list[str]:
+    pending = []
+    for rows in sources_rows:          # urutan sumber lalu urutan sheet = urutan untuk tanggal sama
+        for r in rows[1:]:
+            if r[3] != "Complete":
+                day = datetime.strptime(r[5], "%d/%m/%Y").date() if r[5] else date.min
+                pending.append((day, r[0]))
+    pending.sort(key=lambda x: x[0], reverse=newest_first)
+    return [order_id for _, order_id in pending[:limit]]
+
+
+@pytest.fixture
+def two_sources(monkeypatch):
+    sources = [("test-sheet", "A"), ("test-sheet", "B")]
+    data = [_rows(500, seed=1, prefix="A"), _rows(500, seed=2, prefix="B")]
+    monkeypatch.setattr(sheets, "SOURCES", sources)
+    monkeypatch.setattr(sheets, "SNAPSHOT_TTL", float("inf"))
+    monkeypatch.setattr(sheets, "USE_NUMPY", False)
+    for key, rows in zip(sources, data):
+        monkeypatch.setitem(sheets._snapshots, key, sheets._build_snapshot(rows))
+    return data
+
+
+@pytest.mark.parametrize("newest_first", [False, True])
+@pytest.mark.parametrize("limit", [1, 5, 37, 200, 10000])
+def test_limit_returns_true_top_k_across_sources(two_sources, limit, newest_first):
+    got = [o.order_id for o in sheets.list_pending(limit=limit, newest_first=newest_first)]
+    assert got == _expected(two_sources, limit, newest_first)
+
+
+def test_undated_rows_are_included(two_sources):
+    got = sheets.list_pending(limit=10000)
+    undated = [o for o in got if o.order_day is None]
+    assert undated and got[:len(undated)] == undated   # tanpa tanggal = date.min → paling awal
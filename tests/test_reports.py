@@ -0,0 +1,75 @@
+"""
+Parser cron & penjadwalan laporan (reports.py).
+"""
+from datetime import datetime
+
+import pytest
+
+import reports
+from reports import Cron, ReportSpec
+
+
+def _spec(name: str, schedule: str, chats=None, kind="pending", branch=None, days=7) -> ReportSpec:
+    return ReportSpec(name, kind, branch, days, Cron.parse(schedule), chats)
+
+
+@pytest.mark.parametrize("expr,lo,hi,expected", [
+    ("*", 0, 5, {0, 1, 2, 3, 4, 5}),
+    ("*/15", 0, 59, {0, 15, 30, 45}),
+    ("1-5", 0, 7, {1, 2, 3, 4, 5}),
+    ("10-20/5", 0, 59, {10, 15, 20}),
+    ("5/20", 0, 59, {5, 25, 45}),
+    ("1,3,5-6", 0, 7, {1, 3, 5, 6}),
+])
+def test_parse_field_steps_and_ranges(expr, lo, hi, expected):
+    assert reports._parse_field(expr, lo, hi) == expected
+
+
+@pytest.mark.parametrize("expr", ["60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8",
+                                  "*/0 * * * *", "5-1 * * * *", "* * * *", "a * * * *"])
+def test_invalid_cron(expr):
+    with pytest.raises(ValueError):
+        Cron.parse(expr)
+
+
+@pytest.mark.parametrize("dow", ["0", "7"])
+def test_zero_and_seven_are_sunday(dow):
+    cron = Cron.parse(f"0 8 * * {dow}")
+    assert cron.matches(datetime(2025, 8, 3, 8, 0))        # Minggu
+    assert not cron.matches(datetime(2025, 8, 4, 8, 0))    # Senin
+
+
+def test_weekday_range():
+    cron = Cron.parse("0 17 * * 1-5")
+    assert [cron.matches(datetime(2025, 8, d, 17, 0)) for d in range(3, 10)] == \
+        [False, True, True, True, True, True, False]       # Minggu 3 Agustus … Sabtu 9 Agustus
+
+
+def test_dom_and_dow_restricted_match_either():
+    cron = Cron.parse("0 9 1 * 1")   # tanggal 1 ATAU hari Senin
+    assert cron.matches(datetime(2025, 8, 1, 9, 0))        # Jumat tanggal 1
+    assert cron.matches(datetime(2025, 8, 4, 9, 0))        # Senin tanggal 4
+    assert not cron.matches(datetime(2025, 8, 5, 9, 0))    # Selasa tanggal 5
+
+
+def test_dom_or_dow_wildcard_needs_both():
+    assert Cron.parse("0 9 1 * *").matches(datetime(2025, 8, 1, 9, 0))
+    assert not Cron.parse("0 9 1 * *").matches(datetime(2025, 8, 4, 9, 0))
+    assert not Cron.parse("0 9 * * 1").matches(datetime(2025, 8, 1, 9, 0))
+
+
+def test_due_reports_dedups_chats_across_specs():
+    now = datetime(2025, 8, 4, 10, 15)
+    specs = [
+        _spec("a", "15 10 * * *", chats=(1, 2)),
+        _spec("b", "15 10 * * 1", chats=(2, 3), branch=None),   # isi sama dengan "a"
+        _spec("c", "15 10 * * *", chats=None),                   # ADMIN_CHAT_IDS
+        _spec("d", "15 10 * * *", chats=(1,), branch="jambi"),   # isi berbeda
+        _spec("e", "0 9 * * *", chats=(9,)),                     # belum jatuh tempo
+    ]
+    due = reports.due_reports(specs, now, admins=[3, 4])
+    assert [(spec.name, chats) for spec, chats in due] == [("a", [1, 2, 3, 4]), ("d", [1])]
+
+
+def test_due_reports_skips_groups_without_chats():
+    assert reports.due_reports([_spec("a", "* * * * *")], datetime(2025, 8, 4, 10, 15), admins=[]) == []
@@ -0,0 +1,74 @@
+"""
+Engine NumPy (SHEETS_ENGINE=numpy) harus memberi hasil yang identik dengan jalur Python murni,
+termasuk urutan untuk tanggal yang sama. Dilewati kalau numpy tidak terpasang.
+"""
+import itertools
+import random
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import sheets  # noqa: E402
+
+HEADER = ["ORDER_ID", "NO SC", "CUSTOMER_NAME", "STATUS DO", "JENIS ORDER", "ORDER_DATE", "BRANCH"]
+STATUSES = ["Complete", "Cancel", "Completed (PS)", "Pending", "Provisioning", "OGP", "", "In Progress"]
+BRANCHES = ["JAMBI", "MUARO JAMBI", "muarojambi ", "SUNGAI PENUH", ""]
+
+
+def _rows(n: int, seed: int, prefix: str) -> list[list[str]]:
+    rnd = random.Random(seed)
+    base = date(2025, 1, 1)
+    rows = [HEADER]
+    for i in range(n):
+        d = base + timedelta(days=rnd.randrange(200))
+        rows.append([
+            f"{prefix}1{i:06d}",
+            f"SC{prefix}{i:06d}",
+            f"Customer {rnd.choice(['Budi', 'Ani', 'Sari'])} {i % 37}",
+            rnd.choice(STATUSES),
+            rnd.choice(["MO", "do", "XX", ""]),
+            rnd.choice([d.isoformat(), d.strftime("%d/%m/%Y"), "-", ""]),
+            rnd.choice(BRANCHES),
+        ][:rnd.choice([7, 7, 7, 7, 5])])   # sebagian baris terpotong, seperti sheet asli
+    return rows
+
+
+class _FakeWorksheet:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_values(self):
+        return self.rows
+
+
+@pytest.fixture(scope="module")
+def two_sources():
+    sources = [("test-sheet", "A"), ("test-sheet", "B")]
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sheets, "SOURCES", sources)
+        mp.setattr(sheets, "SNAPSHOT_TTL", float("inf"))   # snapshot dibangun sekali untuk semua kasus
+        for i, key in enumerate(sources):
+            ws = _FakeWorksheet(_rows(3000, seed=i + 10, prefix=str(i)))
+            mp.setitem(sheets._ws_cache, key, ws)
+            mp.setitem(sheets._snapshots, key, sheets._build_snapshot(ws.get_all_values()))
+        yield
+
+
+BRANCH_CASES = [None, "jambi", "MUARO JAMBI", "tidak ada"]
+RANGE_CASES = [(None, None), (date(2025, 3, 1), None), (None, date(2025, 6, 1)),
+               (date(2025, 2, 1), date(2025, 2, 28))]
+KEYWORD_CASES = [None, "budi", "1000"]
+LIMIT_CASES = [1, 7, 50, 100000]
+
+
+@pytest.mark.parametrize("branch,dates,keyword,limit,newest_first", list(itertools.product(
+    BRANCH_CASES, RANGE_CASES, KEYWORD_CASES, LIMIT_CASES, [False, True])))
+def test_numpy_matches_python(two_sources, monkeypatch, branch, dates, keyword, limit, newest_first):
+    kw = dict(branch=branch, start=dates[0], end=dates[1], keyword=keyword, limit=limit,
+              newest_first=newest_first)
+    monkeypatch.setattr(sheets, "USE_NUMPY", False)
+    expected = sheets.list_pending(**kw)
+    monkeypatch.setattr(sheets, "USE_NUMPY", True)
+    assert sheets.list_pending(**kw) == expected
@@ -0,0 +1,75 @@
+"""
+Pemrosesan update Telegram secara paralel, tapi tetap berurutan per chat.
+
+Default python-telegram-bot memproses update satu per satu, jadi satu /summarybranch
+yang lambat menahan /order milik user lain. ChatOrderedProcessor:
+  - update dari chat yang sama diproses berurutan (balasan tidak saling salip)
+  - maks. MAX_INFLIGHT_PER_USER update per user yang jalan bersamaan (lintas chat/inline)
+  - maks. MAX_CONCURRENT_UPDATES update yang jalan bersamaan secara total
+Urutan ambil slot: chat → user → global. Update yang masih menunggu giliran chat/user-nya
+tidak memegang slot global, jadi user berat tidak bisa menghabiskan slot milik user lain.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from telegram.ext import BaseUpdateProcessor
+
+MAX_CONCURRENT_UPDATES = int(os.getenv("BOT_MAX_CONCURRENT_UPDATES", "16"))
+MAX_INFLIGHT_PER_USER = int(os.getenv("BOT_MAX_INFLIGHT_PER_USER", "2"))
+
+# semaphore bawaan BaseUpdateProcessor diambil SEBELUM do_process_update;
+# dibuat longgar supaya batas global yang sebenarnya diambil paling akhir (lihat di atas)
+_OUTER_LIMIT = 1 << 16
+
+
+class _KeyedSlots:
+    """Semaphore per key (chat/user), dibuang lagi begitu tidak ada yang memakai/menunggu."""
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._items: dict[int, list] = {}   # key → [Semaphore, jumlah pemakai + penunggu]
+
+    @asynccontextmanager
+    async def hold(self, key: int | None):
+        if key is None:
+            yield
+            return
+        item = self._items.get(key)
+        if item is None:
+            item = self._items[key] = [asyncio.Semaphore(self.size), 0]
+        item[1] += 1
+        try:
+            async with item[0]:
+                yield
+        finally:
+            item[1] -= 1
+            if not item[1]:
+                del self._items[key]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class ChatOrderedProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_UPDATES,
+                 per_user: int = MAX_INFLIGHT_PER_USER):
+        super().__init__(max_concurrent_updates=_OUTER_LIMIT)
+        self.limit = max(1, max_concurrent)
+        self._global = asyncio.Semaphore(self.limit)
+        self._chats = _KeyedSlots(1)
+        self._users = _KeyedSlots(per_user)
+
+    async def do_process_update(self, update: object, coroutine):
+        chat = getattr(update, "effective_chat", None)
+        user = getattr(update, "effective_user", None)
+        async with self._chats.hold(chat.id if chat else None):
+            async with self._users.hold(user.id if user else None):
+                async with self._global:
+                    await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass